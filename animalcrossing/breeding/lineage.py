@@ -15,8 +15,44 @@ of the tree.
 
 """
 from __future__ import annotations
+import itertools
+import random
+import threading
 import warnings
 
+import numpy as np
+
+from ..cache import BoundedCache
+
+
+class IdAllocator:
+    """Thread safe source of unique ids, start, start+1, ... (1, 2, 3... by default) offset by a namespace.
+
+    Ids are namespace * 2**NAMESPACE_BITS + n, so allocators with different namespaces (e.g. one per worker
+    process) never hand out the same id and trees they grow can be merged.
+    """
+    NAMESPACE_BITS = 40
+
+    def __init__(self, namespace=0, start=1):
+        self.namespace = namespace
+        self._counter = itertools.count(start)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def after(cls, ids) -> IdAllocator:
+        """Allocator (namespace 0) whose ids all come after the given ones, e.g. for a tree rebuilt with saved ids."""
+        return cls(start=max(ids) + 1)
+
+    def __call__(self) -> int:
+        with self._lock:
+            return (self.namespace << IdAllocator.NAMESPACE_BITS) | next(self._counter)
+
+
+def use_namespace(namespace):
+    """Give Parent a fresh default IdAllocator in namespace, e.g. as a multiprocessing.Pool initializer."""
+    Parent.id_allocator = IdAllocator(namespace)
+
+
 class Parent:
     """ A parent (or child) which tracks its (optional) parents and children. (effectively a digraph with two 'roots').
 
@@ -25,19 +61,20 @@ class Parent:
 
     Creating children is done with breed(partner) to return a child and tracks this coupling in a list: self.couplings.
 
-    Identity is tracked by a class wide incrementor, starting at 1. It is planned to allow for storing objects to wrap
+    Identity is tracked by an id from the class wide IdAllocator Parent.id_allocator, starting at 1, unless the child
+    is born into a FamilyTree with its own allocator. It is planned to allow for storing objects to wrap
     more complex data. The class provides methods for identifying
     """
 
-    id_counter = 0
+    id_allocator = IdAllocator()
 
-    def __init__(self, object=None, parent1=None, parent2=None,):
+    def __init__(self, object=None, parent1=None, parent2=None, id=None):
         self.object = object
         self.parent1 = parent1
         self.parent2 = parent2
         self.couplings = []
-        Parent.id_counter += 1
-        self.id = Parent.id_counter
+        self.tree = None
+        self.id = id if id is not None else Parent.id_allocator()
         self.generation = 0
         if parent1 is not None and parent2 is not None:
             self.generation = max(parent1.generation, parent2.generation) + 1
@@ -55,18 +92,41 @@ class Parent:
         else:
             return False
 
-    def breed(self, partner) -> Parent:
+    def breed(self, partner, rng=random) -> Parent:
+        """Breed the objects (drawing from rng, the random module by default) and record the child.
+
+        Objects only need a breed(x) method unless another rng is given, which is passed on as breed(x, rng).
+        """
         try:
-            child_object = self.object.breed(partner.object)
+            if rng is random:
+                child_object = self.object.breed(partner.object)
+            else:
+                child_object = self.object.breed(partner.object, rng)
         except AttributeError as e:
             if partner.object is not None:
                 warnings.warn("Object does not have a breed(x) method.")
             child_object=None
-        child = Parent(child_object, parent1=self, parent2=partner)
+        return self.couple(partner, child_object)
+
+    def couple(self, partner, child_object=None, id=None) -> Parent:
+        """Record a child with a known object (no breeding is simulated), e.g. when replaying a saved lineage.
+
+        Parents from two different FamilyTrees cannot be coupled (ValueError), join the trees with merge_trees first.
+        """
+        if self.tree is not None and partner.tree is not None and self.tree is not partner.tree:
+            raise ValueError(f"Cannot couple {self} and {partner}, they belong to different family trees.")
+        tree = self.tree if self.tree is not None else partner.tree
+        if id is None and tree is not None and tree.ids is not None:
+            id = tree.ids()
+        child = Parent(child_object, parent1=self, parent2=partner, id=id)
+        ## find (and validate) what joins the tree before either parent records the child
+        component = tree._component(child) if tree is not None else None
         coupling = Coupling(partner, child)
         self.couplings.append(coupling)
         partner.couplings.append(coupling)
 
+        if tree is not None:
+            tree._add(component)
         return child
 
     def parents(self) -> list[Parent]:
@@ -76,19 +136,31 @@ class Parent:
             return [self.parent1, self.parent2]
 
     def ancestors(self) -> list[Parent]:
-        ancestry = self.parents()
-        for parent in self.parents():
-            ancestry.extend(parent.ancestors())
-        return list(set(ancestry))
+        """All parents, grandparents, etc. Answered from the tree's closure index when this belongs to a FamilyTree."""
+        if self.tree is not None:
+            return self.tree.ancestors(self)
+        return Parent._closure(self, Parent.parents)
 
     def children(self) -> list[Parent]:
         return [coupling.child for coupling in self.couplings]
 
     def descendants(self) -> list[Parent]:
-        descendants = self.children()
-        for child in self.children():
-            descendants.extend(child.children())
-        return list(set(descendants))
+        """All children, grandchildren, etc. Answered from the tree's closure index when this belongs to a FamilyTree."""
+        if self.tree is not None:
+            return self.tree.descendants(self)
+        return Parent._closure(self, Parent.children)
+
+    @staticmethod
+    def _closure(parent, relatives) -> list[Parent]:
+        """Everything reachable from parent by repeatedly calling relatives(x), each node is only expanded once."""
+        found = set()
+        to_visit = relatives(parent)
+        while to_visit:
+            p = to_visit.pop()
+            if p not in found:
+                found.add(p)
+                to_visit.extend(relatives(p))
+        return list(found)
 
     def siblings(self) -> list[Parent]:
         siblings = []
@@ -119,17 +191,161 @@ class Coupling:
         self.child = child
 
 
+class ClosureIndex:
+    """Memoized transitive closure (ancestors and descendants) of the members of a FamilyTree.
+
+    Members are numbered in the order they are added, which must be after both of their parents, and their parents'
+    and children's numbers are kept alongside so the graph can be walked on plain ints. Ancestor and descendant sets
+    are stored as python int bitsets of those numbers, in two least recently used caches of at most maxbytes each.
+    A member's ancestors never change: they are joined from its parents' when those are memoized, else found by a
+    walk. A memoized descendant set remembers how many members there were and is brought up to date the next time
+    it is asked for by one pass over the members added since (marking those with a marked parent), so adding a
+    member never touches the caches.
+    """
+
+    def __init__(self, maxbytes=64 * 2 ** 20):
+        self.members = []
+        self.position = {}
+        self._parent_positions = []  # per member: positions of its two parents, (-1, -1) for base parents
+        self._child_positions = []  # per member: positions of its children
+        self._ancestors = BoundedCache("lineage.ClosureIndex.ancestors", maxbytes=maxbytes)
+        self._descendants = BoundedCache("lineage.ClosureIndex.descendants", maxbytes=maxbytes)
+
+    def __len__(self):
+        return len(self.members)
+
+    def __contains__(self, parent):
+        return parent in self.position
+
+    def add(self, parent: Parent) -> int:
+        """Number a new member (its parents must already be members) and return its bit position."""
+        bit = len(self.members)
+        self.members.append(parent)
+        self.position[parent] = bit
+        self._child_positions.append([])
+        if parent.is_base_parent():
+            self._parent_positions.append((-1, -1))
+        else:
+            p1, p2 = self.position[parent.parent1], self.position[parent.parent2]
+            self._parent_positions.append((p1, p2))
+            self._child_positions[p1].append(bit)
+            if p2 != p1:
+                self._child_positions[p2].append(bit)
+        return bit
+
+    def ancestor_bits(self, parent: Parent) -> int | None:
+        """Bitset of parent's ancestors, None if parent is not indexed."""
+        bit = self.position.get(parent)
+        if bit is None:
+            return None
+        bits = self._ancestors.get(bit)
+        if bits is None:
+            p1, p2 = self._parent_positions[bit]
+            known = (self._ancestors.get(p1), self._ancestors.get(p2)) if p1 >= 0 else (0, 0)
+            if known[0] is not None and known[1] is not None:
+                bits = known[0] | known[1] | (0 if p1 < 0 else 1 << p1 | 1 << p2)
+            else:
+                bits = self._walk(bit, self._parent_positions)
+            self._ancestors[bit] = bits
+        return bits
+
+    def descendant_bits(self, parent: Parent) -> int | None:
+        """Bitset of parent's descendants, None if parent is not indexed."""
+        bit = self.position.get(parent)
+        if bit is None:
+            return None
+        entry = self._descendants.get(bit)
+        if entry is None:
+            bits = self._walk(bit, self._child_positions)
+        elif entry[1] < len(self.members):
+            bits = self._extend_descendants(bit, *entry)
+        else:
+            return entry[0]
+        self._descendants[bit] = (bits, len(self.members))
+        return bits
+
+    def ancestors(self, parent: Parent) -> list[Parent]:
+        return self._related(parent, self.ancestor_bits, Parent.parents)
+
+    def descendants(self, parent: Parent) -> list[Parent]:
+        return self._related(parent, self.descendant_bits, Parent.children)
+
+    def _related(self, parent, bits_of, relatives) -> list[Parent]:
+        """Members from the bitset, or by walking the graph (Parent._closure) if parent is not indexed."""
+        bits = bits_of(parent)
+        if bits is None:
+            return Parent._closure(parent, relatives)
+        return self.to_members(bits)
+
+    def _walk(self, bit, relatives) -> int:
+        """Bitset of everything reachable from bit through relatives[position] (lists of positions, -1 for none)."""
+        flags = bytearray(len(self.members))
+        stack = [bit]
+        while stack:
+            for r in relatives[stack.pop()]:
+                if r >= 0 and not flags[r]:
+                    flags[r] = 1
+                    stack.append(r)
+        return self._to_bits(flags)
+
+    def _extend_descendants(self, bit, bits, count) -> int:
+        """bits (bit's descendants among the first count members) with the descendants among the members since."""
+        flags = self._flags(bits | 1 << bit)
+        parent_positions = self._parent_positions
+        for j in range(count, len(self.members)):
+            p1, p2 = parent_positions[j]
+            if p1 >= 0 and (flags[p1] or flags[p2]):
+                flags[j] = 1
+        flags[bit] = 0
+        return self._to_bits(flags)
+
+    def _flags(self, bits) -> bytearray:
+        """One byte per member, 1 where bits is set."""
+        n = len(self.members)
+        raw = np.frombuffer(bits.to_bytes((n + 7) // 8, 'little'), dtype=np.uint8)
+        return bytearray(np.unpackbits(raw, count=n, bitorder='little').tobytes())
+
+    @staticmethod
+    def _to_bits(flags) -> int:
+        """Bitset of one byte (0 or 1) per member."""
+        packed = np.packbits(np.frombuffer(flags, dtype=np.uint8), bitorder='little')
+        return int.from_bytes(packed.tobytes(), 'little')
+
+    def to_members(self, bits: int) -> list[Parent]:
+        """Members whose bits are set, in the order they were added."""
+        n = len(self.members)
+        raw = np.frombuffer(bits.to_bytes((n + 7) // 8, 'little'), dtype=np.uint8)
+        members = self.members
+        return [members[i] for i in np.flatnonzero(np.unpackbits(raw, count=n, bitorder='little')).tolist()]
+
+
 class FamilyTree:
     """Basic graph structure which has two 'root' parents.
 
     Has methods for listing all elements of the family tree. More traditional Node/Edge pairs can be returned from
     members() and directed_edges() functions.
+
+    Every member of the tree references it (Parent.tree) so children bred by any member are added as they are born,
+    together with any outside parent (and that parent's relatives) they were bred with; members of another tree
+    cannot be bred with (join the trees with merge_trees). Ancestor and descendant
+    queries are answered by a ClosureIndex kept alongside. Callables in listeners are called with each new member
+    once it has been added (e.g. to record the tree's growth).
+
+    Children born into the tree take their ids from ids (an IdAllocator) if given, else from Parent.id_allocator.
+    Trees grown in parallel with different id namespaces can be joined with merge_trees. If breed, the roots' first
+    child is bred drawing from rng (see Parent.breed).
     """
 
-    def __init__(self, parent1:Parent, parent2:Parent):
+    def __init__(self, parent1:Parent, parent2:Parent, breed=True, ids:IdAllocator=None, rng=random):
         self.parent1 = parent1
         self.parent2 = parent2
-        self.parent1.breed(self.parent2)
+        self.ids = ids
+        self.closure = ClosureIndex()
+        self.listeners = []
+        self.adopt(parent1)
+        self.adopt(parent2)
+        if breed:
+            self.parent1.breed(self.parent2, rng)
 
     def __repr__(self):
         members = self.members()
@@ -140,23 +356,52 @@ class FamilyTree:
         return cls(Parent(parent1), Parent(parent2))
 
     def members(self):
-        members = FamilyTree._members(self.parent1)
-        for member in members:
-            del member.__visited
-        return members
-
-    def _members(parent: Parent):
-        members = [parent]
-        parent.__visited = None
-        ## Ordering like this:children then parents gives "deeper" depth first ordering
-        drs = parent.children()
-        drs.extend(parent.parents())
-        for dr in drs:
-            try:
-                dr.__visited is None
-            except AttributeError:
-                members.extend(FamilyTree._members(dr))
-        return members
+        """All members in the order they joined the tree (parents always before their children)."""
+        return list(self.closure.members)
+
+    def adopt(self, parent: Parent):
+        """Add parent and every non-member connected to it (through children or parents) to the tree.
+
+        Members of other trees are never moved, ValueError is raised if any are connected.
+        """
+        self._add(self._component(parent))
+
+    def _component(self, parent: Parent) -> set:
+        """Non-members connected to parent (none if it is a member), ValueError if any belong to another tree."""
+        if parent in self.closure:
+            return set()
+        component = {parent}
+        to_visit = [parent]
+        while to_visit:
+            p = to_visit.pop()
+            if p.tree is not None and p.tree is not self:
+                raise ValueError(f"{p} already belongs to another family tree, join the trees with merge_trees.")
+            for relative in p.children() + p.parents():
+                if relative not in component and relative not in self.closure:
+                    component.add(relative)
+                    to_visit.append(relative)
+        return component
+
+    def _add(self, component):
+        ## a child's generation is always larger than its parents' so this is a topological ordering
+        for p in sorted(component, key=lambda x: (x.generation, x.id)):
+            p.tree = self
+            self.closure.add(p)
+            for listener in self.listeners:
+                listener(p)
+
+    def ancestors(self, member: Parent) -> list[Parent]:
+        return self.closure.ancestors(member)
+
+    def descendants(self, member: Parent) -> list[Parent]:
+        return self.closure.descendants(member)
+
+    def is_ancestor(self, ancestor: Parent, member: Parent) -> bool:
+        """True if ancestor is a parent, grandparent, etc. of member."""
+        bits = self.closure.ancestor_bits(member)
+        if bits is None or ancestor not in self.closure:
+            return ancestor in self.closure.ancestors(member)
+        return bool(bits >> self.closure.position[ancestor] & 1)
 
     def originators(self):
         return [x for x in self.members() if x.is_base_parent()]
@@ -177,6 +422,46 @@ class FamilyTree:
         return edges
 
 
+def merge_records(record_lists) -> list[tuple]:
+    """Join lists of (id, parent1 id, parent2 id, generation, object) records into one list ordered parents first.
+
+    Base parents have parent ids 0. A record whose id appears in several lists must be identical in each (same
+    parents, generation and an equal object) otherwise ValueError is raised.
+    """
+    merged = {}
+    for records in record_lists:
+        for record in records:
+            known = merged.setdefault(record[0], record)
+            if known != record:
+                raise ValueError(f"Conflicting lineage records for id {record[0]}: {known} and {record}")
+    return sorted(merged.values(), key=lambda r: (r[3], r[0]))
+
+
+def merge_trees(*trees: FamilyTree) -> FamilyTree:
+    """Join trees (e.g. grown by separate workers from shared seed parents) into a new tree of new Parent objects.
+
+    Members are matched by id so trees should have been grown with different id namespaces (see IdAllocator).
+    Every merged member keeps its id and object; the new tree's two root parents are those of the first tree.
+    Children born into the merged tree take ids after the largest merged id.
+    """
+    def to_record(p):
+        ids = (0, 0) if p.is_base_parent() else (p.parent1.id, p.parent2.id)
+        return (p.id, *ids, p.generation, p.object)
+
+    records = merge_records([[to_record(m) for m in tree.members()] for tree in trees])
+    parents = {}
+    for id, parent1, parent2, _, object in records:
+        if parent1 == 0:
+            parents[id] = Parent(object, id=id)
+        else:
+            parents[id] = parents[parent1].couple(parents[parent2], object, id=id)
+    tree = FamilyTree(parents[trees[0].parent1.id], parents[trees[0].parent2.id], breed=False,
+                      ids=IdAllocator.after(parents))
+    for parent in parents.values():
+        tree.adopt(parent)
+    return tree
+
+
 if __name__ == "__main__":
     p1 = Parent.base_parent("a")
     p2 = Parent.base_parent("b")
@@ -0,0 +1,211 @@
+"""
+Module which saves the growth of a FamilyTree as an append-only
+binary log and reloads it.
+
+Every member of a tree is written as one fixed-width event
+(its id, its parents' ids, its generation and its object encoded as
+a species and genotype code) in the order it joined the tree, so parents
+are always written before their children. A log can be read back lazily
+through a memory map, viewed as numpy columns, or replayed into a new
+FamilyTree with exactly the same members, objects and ids, without
+simulating any breeding.
+
+By default objects are expected to be Flowers (or None); other objects
+can be stored by setting encode_method/decode_method.
+
+Running as a main/script grows a small random tulip tree, logs it to
+a temporary file and compares the replayed tree with the original.
+"""
+from collections import namedtuple
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from .lineage import IdAllocator, Parent, FamilyTree, merge_records
+from ..flowers.flower import Flower
+from ..flowers.species import Species
+
+_MAGIC = b"FLWRLOG1"
+## header: magic, id of tree.parent1, id of tree.parent2 (same width as an event)
+_HEADER = struct.Struct("<8sQQ8x")
+## event: id, parent1 id, parent2 id (0 for base parents), generation, species, genotype code
+_EVENT = struct.Struct("<QQQHBB4x")
+EVENT_DTYPE = np.dtype([('id', '<u8'), ('parent1', '<u8'), ('parent2', '<u8'), ('generation', '<u2'),
+                        ('species', 'u1'), ('genes', 'u1'), ('_pad', 'V4')])
+assert _HEADER.size == _EVENT.size == EVENT_DTYPE.itemsize
+
+LineageEvent = namedtuple("LineageEvent", ['id', 'parent1', 'parent2', 'generation', 'species', 'genes'])
+
+
+def encode_flower(flower):
+    """Return (species, genotype code) of a Flower, (0, 0) if there is no flower."""
+    if flower is None:
+        return 0, 0
+    return flower.species.value, flower.genotype_code()
+
+
+def decode_flower(species, genes):
+    if species == 0:
+        return None
+    return Flower.from_genotype_code(Species(species), genes)
+
+
+class LineageLog:
+    """Append-only writer of lineage events.
+
+    Use record(tree) to write every current member of a tree and then each new member as it is born.
+    """
+
+    def __init__(self, path, encode_method=encode_flower):
+        self.path = path
+        self.encode_method = encode_method
+        self.file = open(path, 'ab')
+        self.tree = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record(self, tree: FamilyTree):
+        if self.file.tell() == 0:
+            self.file.write(_HEADER.pack(_MAGIC, tree.parent1.id, tree.parent2.id))
+        for member in tree.members():
+            self.append(member)
+        tree.listeners.append(self.append)
+        self.tree = tree
+
+    def append(self, parent: Parent):
+        if parent.is_base_parent():
+            ids = 0, 0
+        else:
+            ids = parent.parent1.id, parent.parent2.id
+        self.file.write(_EVENT.pack(parent.id, *ids, parent.generation, *self.encode_method(parent.object)))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.tree is not None:
+            self.tree.listeners.remove(self.append)
+            self.tree = None
+        self.file.close()
+
+
+class LineageLogReader:
+    """Read only, lazily decoded view of a lineage log through a memory map."""
+
+    def __init__(self, path, decode_method=decode_flower):
+        self.path = path
+        self.decode_method = decode_method
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.parent1_id, self.parent2_id = _HEADER.unpack_from(self.map, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a lineage log.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.map) // _EVENT.size - 1
+
+    def __getitem__(self, i) -> LineageEvent:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"Event {i} not in log of {len(self)} events.")
+        return LineageEvent(*_EVENT.unpack_from(self.map, _HEADER.size + i * _EVENT.size))
+
+    def __iter__(self):
+        ## no memoryview is held between events, so the log can be closed while a loop over it is left early
+        for i in range(len(self)):
+            yield LineageEvent(*_EVENT.unpack_from(self.map, _HEADER.size + i * _EVENT.size))
+
+    def columns(self) -> np.ndarray:
+        """Structured array of all events (fields as in EVENT_DTYPE) backed by the memory map, nothing is copied."""
+        return np.frombuffer(self.map, dtype=EVENT_DTYPE, offset=_HEADER.size)
+
+    def replay(self) -> FamilyTree:
+        """Rebuild the logged tree, every Parent keeps the id it was logged with.
+
+        Children bred into the replayed tree take ids after the largest logged id. Raises ValueError if the log has no records for the tree's two parents (e.g. it is empty).
+        """
+        parents = {}
+        tree = None
+        for event in self:
+            obj = self.decode_method(event.species, event.genes)
+            if event.parent1 == 0:
+                parent = Parent(obj, id=event.id)
+            else:
+                parent = parents[event.parent1].couple(parents[event.parent2], obj, id=event.id)
+            parents[event.id] = parent
+            if tree is None and self.parent1_id in parents and self.parent2_id in parents:
+                tree = FamilyTree(parents[self.parent1_id], parents[self.parent2_id], breed=False)
+        if tree is None:
+            missing = [id for id in (self.parent1_id, self.parent2_id) if id not in parents]
+            raise ValueError(f"{self.path} has no records for the tree's parent ids {missing} ({len(self)} events).")
+        ## members not (yet) related to the tree's parents when they were replayed, e.g. from a merged log
+        for parent in parents.values():
+            tree.adopt(parent)
+        tree.ids = IdAllocator.after(parents)
+        return tree
+
+    def close(self):
+        self.map.close()
+
+
+def replay(path, decode_method=decode_flower) -> FamilyTree:
+    with LineageLogReader(path, decode_method) as reader:
+        return reader.replay()
+
+
+def merge_logs(paths, out_path):
+    """Join logs written by parallel workers into one log at out_path (see lineage.merge_records).
+
+    The merged log's tree parents are those of the first log.
+    """
+    readers = [LineageLogReader(path) for path in paths]
+    try:
+        records = merge_records([[(e.id, e.parent1, e.parent2, e.generation, (e.species, e.genes)) for e in reader]
+                                 for reader in readers])
+        with open(out_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, readers[0].parent1_id, readers[0].parent2_id))
+            for id, parent1, parent2, generation, (species, genes) in records:
+                f.write(_EVENT.pack(id, parent1, parent2, generation, species, genes))
+    finally:
+        for reader in readers:
+            reader.close()
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    random.seed(0)
+    seeds = [Parent(f) for f in Flower.seeds(Species.TULIP)]
+    tree = FamilyTree(seeds[0], seeds[1], breed=False)
+    path = os.path.join(tempfile.mkdtemp(), "tulips.lineage")
+    with LineageLog(path) as log:
+        log.record(tree)
+        for _ in range(200):
+            p1, p2 = random.sample(tree.members() + seeds[2:], 2)
+            p1.breed(p2)
+
+    with LineageLogReader(path) as reader:
+        print(f"{len(reader)} events, {os.path.getsize(path)} bytes")
+        print(reader[0], reader[-1])
+        cols = reader.columns()
+        print(f"Max generation {cols['generation'].max()}")
+        del cols  ## the map can only be closed once no array references it
+        copy = reader.replay()
+
+    original = [(m.id, m.generation, m.object) for m in tree.members()]
+    replayed = [(m.id, m.generation, m.object) for m in copy.members()]
+    print(f"Replayed {copy} identical to original {tree}: {original == replayed}")
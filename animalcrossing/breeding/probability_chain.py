@@ -11,6 +11,7 @@ import networkx
 from ..flowers.flower import Flower
 from ..flowers.species import Species
 from ..flowers.color import FlowerColor
+from .. import metrics
 import itertools
 import graphviz
 import math
@@ -36,6 +37,7 @@ class ProbabilityChain:
         seed_flowers = Flower.seeds(self.species)
         self.graph.add_nodes_from(seed_flowers)
 
+    @metrics.timed("probability_chain.exaustive_enumeration")
     def exaustive_enumeration(self):
         """Populate DiGraph with all breeding pairs and their children; weights from breeding pair are the probability, weights to breeding pairs are zero (free)."""
         all_flowers = Flower.genotypes(self.species)
@@ -59,6 +61,7 @@ class ProbabilityChain:
         else:
             return None
 
+    @metrics.timed("probability_chain.up_to_gen_x")
     def up_to_gen_x(self, x) -> networkx.DiGraph:
         """Return subgraph of flowers and breeding pairs up to X generations from the species' seed flowers."""
         available = set(Flower.seeds(self.species))
@@ -71,6 +74,7 @@ class ProbabilityChain:
                 available.update(set(succs))
         return self.graph.subgraph(available|couples)
 
+    @metrics.timed("probability_chain.mark_generations")
     def mark_generations(self):
         """Add attribute to nodes indicating their generation from the flower seeds.
 
@@ -0,0 +1,67 @@
+"""
+Module which defines FenwickSampler, a weighted random
+selection whose weights can be changed or added to cheaply.
+
+Meant to replace rebuilding lists of options and weights for
+random.choices every time a single weight changes, e.g. when
+choosing breeding partners from a growing family tree.
+"""
+import random
+
+
+class FenwickSampler:
+    """Weighted random choice of an index 0..n-1 backed by a Fenwick (binary indexed) tree.
+
+    append(weight), add(i, delta) and sample() are all O(log n). Weights must be non-negative.
+    """
+
+    def __init__(self, weights=()):
+        self.weights = []
+        self._tree = [0.0]  # 1-based, _tree[i] holds the sum of weights (i - lowbit(i), i]
+        for w in weights:
+            self.append(w)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def append(self, weight) -> int:
+        """Add a new option with weight and return its index."""
+        self.weights.append(weight)
+        i = len(self.weights)
+        self._tree.append(weight + self._prefix(i - 1) - self._prefix(i - (i & -i)))
+        return i - 1
+
+    def add(self, index, delta):
+        self.weights[index] += delta
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def set(self, index, weight):
+        self.add(index, weight - self.weights[index])
+
+    def total(self):
+        return self._prefix(len(self.weights))
+
+    def _prefix(self, i):
+        """Sum of the first i weights."""
+        s = 0.0
+        while i > 0:
+            s += self._tree[i]
+            i -= i & -i
+        return s
+
+    def sample(self, rng=random) -> int:
+        """Random index chosen with probability weight/total."""
+        r = rng.random() * self.total()
+        pos = 0
+        mask = 1 << (len(self.weights).bit_length() - 1) if self.weights else 0
+        while mask:
+            nxt = pos + mask
+            if nxt < len(self._tree) and self._tree[nxt] <= r:
+                pos = nxt
+                r -= self._tree[nxt]
+            mask >>= 1
+        ## pos weights sum to at most r, so pos is the chosen index (guard against rounding past the end)
+        return min(pos, len(self.weights) - 1)
@@ -2,6 +2,9 @@
 Work in progress!
 
 Exploratory methods for determining best/shortest path to certain flower colors. 
+
+Importing does no work, running as a main/script loads the breeding time
+tables and explores paths to the hard tulip colors.
 """
 from ..flowers.species import Species
 from ..flowers.flower import Flower
@@ -10,9 +13,12 @@ import networkx
 from networkx.algorithms.shortest_paths import all_shortest_paths
 
 import animalcrossing.time.expected_breeding_time as breeding_time
+from animalcrossing.time import analytic_approximation
+from animalcrossing import cache
+from animalcrossing import metrics
 
-breeding_time.init()
-breeding_time.alpha=0.5
+## shortest_paths results by (chain, source, target, weight), cleared whenever weight_edges changes the weights
+_path_cache = cache.BoundedCache("shortest_path.shortest_paths", maxsize=1024, tags=("paths", "heredity"))
 
 def pretty_print(graph, path):
     str = ""
@@ -25,49 +31,85 @@ def pretty_print(graph, path):
         print(f"{f1} x {f2} ->(p:{prob},t:{time})-> {child}")
         i += 2
 
-for species in [Species.TULIP]:
-    chain = ProbabilityChain(species)
-    chain.exaustive_enumeration()
+@metrics.timed("shortest_path.weight_edges")
+def weight_edges(chain, num_pairs=8, exact=False):
+    """Set each probability edge's weight to the days num_pairs pairs need to breed its child.
+
+    Interpolates the precomputed tables, or if exact computes each edge's own PMF (analytic_approximation.pmf_for).
+    Cached shortest paths are invalidated.
+    """
+    edges = list(chain.prob_edges())
+    pxs = [chain.graph.edges[edge]['probability'] for edge in edges]
+    if exact:
+        ## any of num_pairs pairs succeeds with probability alpha once each one's cdf reaches q
+        q = 1. - (1. - breeding_time.alpha) ** (1. / num_pairs)
+        times = [analytic_approximation.pmf_for(px).quantile(q) for px in pxs]
+    else:
+        #times = breeding_time.time_to(pxs)
+        times = breeding_time.time_n_pairs(pxs,num_pairs)
+    for edge, time in zip(edges, times):
+        chain.graph.edges[edge]['weight'] = float(time)
+    cache.invalidate("paths")
+
+@metrics.timed("shortest_path.shortest_paths")
+def shortest_paths(chain, source, target, weight='weight') -> list:
+    """Every shortest path from source to target in the chain's graph, [source, pair, child, pair, ..., target].
+
+    Results are cached, call cache.invalidate("paths") after changing the graph other than by weight_edges.
+    """
+    paths = _path_cache.get_or_compute((chain, source, target, weight), _all_shortest_paths,
+                                       chain.graph, source, target, weight)
+    return [list(path) for path in paths]
+
+
+def _all_shortest_paths(graph, source, target, weight):
+    return [tuple(path) for path in all_shortest_paths(graph, source, target, weight=weight)]
+
+
+def main():
+    breeding_time.init()
+    breeding_time.alpha=0.5
 
-    for edge in chain.prob_edges():
-        px = chain.graph.edges[edge]['probability']
-        #time = breeding_time.time_to(px)
-        time = breeding_time.time_n_pairs(px,8)
-        chain.graph.edges[edge]['weight'] = time
+    for species in [Species.TULIP]:
+        chain = ProbabilityChain(species)
+        chain.exaustive_enumeration()
 
+        weight_edges(chain, 8)
 
-    print(f"{species}")
-    print(f"Seed colors: {chain.seed_colors()}")
-    print(f"Easy colors: {chain.easy_colors()}")
-    print(f"Hard colors: {chain.hard_colors()}")
-    hard_color_flowers = [flower for flower in Flower.genotypes(species) if flower.color in chain.hard_colors()]
-    print(f"{len(hard_color_flowers)} hard flowers: {hard_color_flowers}")
+        print(f"{species}")
+        print(f"Seed colors: {chain.seed_colors()}")
+        print(f"Easy colors: {chain.easy_colors()}")
+        print(f"Hard colors: {chain.hard_colors()}")
+        hard_color_flowers = [flower for flower in Flower.genotypes(species) if flower.color in chain.hard_colors()]
+        print(f"{len(hard_color_flowers)} hard flowers: {hard_color_flowers}")
 
 
-    paths = []
-    for flower in hard_color_flowers[:1]:
-        for seed in Flower.seeds(species)[:1]:
-            paths.extend(all_shortest_paths(chain.graph,seed,flower,weight='weight'))
-    pretty_print(chain.graph, paths[0])
+        paths = []
+        for flower in hard_color_flowers[:1]:
+            for seed in Flower.seeds(species)[:1]:
+                paths.extend(shortest_paths(chain, seed, flower))
+        pretty_print(chain.graph, paths[0])
 
-    print()
+        print()
 
-    target=Flower.from_compact_form("T220")
-    sub_chain = ProbabilityChain(species)
-    sub_chain.graph = chain.graph_to_target(target)
+        target=Flower.from_compact_form("T220")
+        sub_chain = ProbabilityChain(species)
+        sub_chain.graph = chain.graph_to_target(target)
 
-    sub_chain.graph = sub_chain.graph.copy()
-    for seed in Flower.seeds(sub_chain.species):
-        # print(sub_chain.graph.in_edges(seed))
-        e_into_seed = list(sub_chain.graph.in_edges(seed))
-        sub_chain.graph.remove_edges_from(e_into_seed)
-    e_out_target = list(sub_chain.graph.out_edges(target))
-    sub_chain.graph.remove_edges_from(e_out_target)
+        sub_chain.graph = sub_chain.graph.copy()
+        for seed in Flower.seeds(sub_chain.species):
+            # print(sub_chain.graph.in_edges(seed))
+            e_into_seed = list(sub_chain.graph.in_edges(seed))
+            sub_chain.graph.remove_edges_from(e_into_seed)
+        e_out_target = list(sub_chain.graph.out_edges(target))
+        sub_chain.graph.remove_edges_from(e_out_target)
 
-    #Remove other purples
-    sub_chain.graph.remove_node(Flower.from_compact_form("T222"))
-    sub_chain.graph.remove_node(Flower.from_compact_form("T221"))
+        #Remove other purples
+        sub_chain.graph.remove_node(Flower.from_compact_form("T222"))
+        sub_chain.graph.remove_node(Flower.from_compact_form("T221"))
 
-    sub_chain.render("SubGraphPurpleTulip")
+        sub_chain.render("SubGraphPurpleTulip")
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Tests for animalcrossing.breeding.lineage: ids of trees rebuilt from
+saved ids (merged or replayed) and the closure index.
+
+Run with pytest.
+"""
+import random
+
+import pytest
+
+from animalcrossing.breeding import lineage_log
+from animalcrossing.breeding.lineage import FamilyTree, IdAllocator, Parent, merge_trees
+from animalcrossing.flowers.flower import Flower
+from animalcrossing.flowers.species import Species
+
+
+def grow(tree, children, rng):
+    for _ in range(children):
+        p1, p2 = rng.sample(tree.members(), 2)
+        p1.breed(p2, rng)
+    return tree
+
+
+def flower_tree(namespace, children, seed):
+    """Tulip tree grown with ids in namespace from the two seed parents (ids 1 and 2 in every namespace)."""
+    rng = random.Random(seed)
+    seeds = [Parent(f, id=i) for i, f in enumerate(Flower.seeds(Species.TULIP)[:2], start=1)]
+    ids = IdAllocator(namespace, start=3)
+    return grow(FamilyTree(*seeds, breed=False, ids=ids), children, rng)
+
+
+def assert_unique_ids(tree):
+    ids = [m.id for m in tree.members()]
+    assert len(ids) == len(set(ids))
+
+
+def test_breeding_after_merge_gives_new_ids(monkeypatch):
+    merged = merge_trees(flower_tree(1, 20, 0), flower_tree(2, 20, 1))
+    monkeypatch.setattr(Parent, "id_allocator", IdAllocator())  # as in a new process
+    grow(merged, 10, random.Random(2))
+    assert_unique_ids(merged)
+
+
+def test_breeding_after_replay_gives_new_ids(tmp_path, monkeypatch):
+    tree = flower_tree(0, 0, 0)
+    path = tmp_path / "tulips.lineage"
+    with lineage_log.LineageLog(path) as log:
+        log.record(tree)
+        grow(tree, 20, random.Random(3))
+    monkeypatch.setattr(Parent, "id_allocator", IdAllocator())  # as in a new process
+    replayed = lineage_log.replay(path)
+    grow(replayed, 10, random.Random(4))
+    assert_unique_ids(replayed)
+    assert len(replayed.members()) == len(tree.members()) + 10
+
+
+def test_closure_index_matches_walk():
+    rng = random.Random(5)
+    tree = flower_tree(0, 0, 5)
+    for _ in range(6):
+        ## query every member so the memos are warm before the next births extend them
+        for m in tree.members():
+            assert set(tree.ancestors(m)) == set(Parent._closure(m, Parent.parents))
+            assert set(tree.descendants(m)) == set(Parent._closure(m, Parent.children))
+        grow(tree, 15, rng)
+        p = rng.choice(tree.members())
+        p.breed(p, rng)  # self pairing
+    members = tree.members()
+    for m in members:
+        ancestors = set(Parent._closure(m, Parent.parents))
+        assert set(tree.descendants(m)) == set(Parent._closure(m, Parent.children))
+        assert all(tree.is_ancestor(a, m) == (a in ancestors) for a in members)
+
+
+def test_couple_across_trees_raises_without_recording():
+    a, b = flower_tree(1, 5, 6), flower_tree(2, 5, 7)
+    a_member, b_member = a.members()[-1], b.members()[-1]
+    with pytest.raises(ValueError):
+        a_member.couple(b_member)
+    ## a stray parent with parents in b only joins a through the new child
+    stray = Parent(None, parent1=b_member, parent2=b_member)
+    with pytest.raises(ValueError):
+        a_member.couple(stray)
+    assert a_member.couplings == [] and b_member.couplings == []
+    assert len(a.members()) == 7 and stray.tree is None
@@ -0,0 +1,66 @@
+"""
+Tests for animalcrossing.breeding.lineage_log: recording, replaying and merging lineage logs.
+
+Run with pytest.
+"""
+import random
+
+import pytest
+
+from animalcrossing.breeding import lineage_log
+from animalcrossing.breeding.lineage import IdAllocator, Parent
+from animalcrossing.breeding.test_lineage import assert_unique_ids, flower_tree, grow
+
+
+def logged_tree(path, namespace, children, seed):
+    tree = flower_tree(namespace, 0, seed)
+    with lineage_log.LineageLog(path) as log:
+        log.record(tree)
+        grow(tree, children, random.Random(seed))
+    return tree
+
+
+def lineage(tree):
+    """(id, parent ids, generation, genes) of every member."""
+    return {(m.id, None if m.is_base_parent() else (m.parent1.id, m.parent2.id), m.generation, m.object.genes)
+            for m in tree.members()}
+
+
+def test_replay_rebuilds_logged_tree(tmp_path):
+    path = tmp_path / "tulips.lineage"
+    tree = logged_tree(path, 0, 30, 0)
+    with lineage_log.LineageLogReader(path) as reader:
+        assert len(reader) == len(tree.members())
+        assert [e.id for e in reader] == [m.id for m in tree.members()]
+        assert list(reader.columns()['id']) == [m.id for m in tree.members()]
+        replayed = reader.replay()
+    assert lineage(replayed) == lineage(tree)
+    assert (replayed.parent1.id, replayed.parent2.id) == (tree.parent1.id, tree.parent2.id)
+
+
+def test_merge_logs_replays_every_worker(tmp_path, monkeypatch):
+    paths = [tmp_path / "a.lineage", tmp_path / "b.lineage"]
+    trees = [logged_tree(path, namespace, 20, namespace) for namespace, path in enumerate(paths, start=1)]
+    merged_path = tmp_path / "merged.lineage"
+    lineage_log.merge_logs(paths, merged_path)
+    monkeypatch.setattr(Parent, "id_allocator", IdAllocator())  # as in a new process
+    merged = lineage_log.replay(merged_path)
+    assert lineage(merged) == lineage(trees[0]) | lineage(trees[1])
+    grow(merged, 10, random.Random(2))
+    assert_unique_ids(merged)
+
+
+def test_replay_without_tree_parents_raises(tmp_path):
+    path = tmp_path / "empty.lineage"
+    path.write_bytes(lineage_log._HEADER.pack(lineage_log._MAGIC, 1, 2))
+    with pytest.raises(ValueError):
+        lineage_log.replay(path)
+
+
+def test_close_after_leaving_loop_early(tmp_path):
+    path = tmp_path / "tulips.lineage"
+    logged_tree(path, 0, 5, 0)
+    reader = lineage_log.LineageLogReader(path)
+    for event in reader:
+        break
+    reader.close()  # BufferError if the loop still held a view of the map
@@ -0,0 +1,50 @@
+"""
+Tests for animalcrossing.breeding.sampling.FenwickSampler.
+
+Run with pytest.
+"""
+import random
+from collections import Counter
+
+import pytest
+
+from animalcrossing.breeding.sampling import FenwickSampler
+
+
+def test_prefix_sums_after_updates():
+    rng = random.Random(0)
+    weights = [rng.random() for _ in range(37)]
+    sampler = FenwickSampler(weights[:20])
+    for w in weights[20:]:
+        sampler.append(w)
+    for _ in range(50):
+        i = rng.randrange(len(weights))
+        if rng.random() < 0.5:
+            delta = rng.random()
+            weights[i] += delta
+            sampler.add(i, delta)
+        else:
+            weights[i] = rng.random()
+            sampler.set(i, weights[i])
+    assert sampler.weights == weights
+    for i in range(len(weights) + 1):
+        assert sampler._prefix(i) == pytest.approx(sum(weights[:i]))
+    assert sampler.total() == pytest.approx(sum(weights))
+
+
+def test_sample_frequencies():
+    weights = [1, 0, 3, 0, 4, 2]
+    sampler = FenwickSampler(weights)
+    rng = random.Random(1)
+    n = 20000
+    counts = Counter(sampler.sample(rng) for _ in range(n))
+    assert counts[1] == counts[3] == 0
+    for i, w in enumerate(weights):
+        assert counts[i] / n == pytest.approx(w / sum(weights), abs=0.015)
+
+
+def test_sample_follows_set():
+    sampler = FenwickSampler([1, 1, 1])
+    sampler.set(0, 0)
+    sampler.set(2, 0)
+    assert {sampler.sample(random.Random(seed)) for seed in range(20)} == {1}
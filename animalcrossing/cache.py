@@ -0,0 +1,224 @@
+"""
+Bounded in-memory caches with eviction, statistics and invalidation.
+
+A BoundedCache holds at most maxsize entries and/or maxbytes bytes
+(as estimated by its sizeof function) and evicts the least recently
+used (policy "lru") or least frequently used (policy "lfu", ties go to
+the oldest) entries to stay within them. Every cache counts its hits,
+misses and evictions; the statistics of all caches are reported by
+stats() and in animalcrossing.metrics snapshots.
+
+Caches are tagged with what their results depend on and
+invalidate(tag) clears every cache with that tag:
+
+    "heredity"  results derived from the flower heredity table, cleared by flowers.flower.init
+    "rules"     results computed for a time.rules.WateringRules
+    "paths"     shortest-path queries, cleared whenever edge weights are recomputed
+
+memoize(cache) turns a function into one which looks its arguments up
+in cache first.
+"""
+import functools
+import heapq
+import itertools
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from . import metrics
+
+POLICIES = ("lru", "lfu")
+
+_MISSING = object()
+_caches = weakref.WeakValueDictionary()  # name -> BoundedCache
+
+
+def sizeof(value) -> int:
+    """Estimated bytes of value: numpy arrays by their data, containers with their (not nested) items."""
+    if isinstance(value, np.ndarray):
+        ## an array owning its data includes it in getsizeof, a view keeps its base's data alive
+        return sys.getsizeof(value) + (value.nbytes if value.base is not None else 0)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(v) for v in value)
+    return size
+
+
+class BoundedCache:
+    """Mapping of keys to computed values bounded by maxsize entries and maxbytes bytes (None: unbounded).
+
+    Thread safe: stores, evictions and clears hold a lock, lookups of the lru policy rely on the atomic
+    OrderedDict operations instead (statistics may then miss a count under contention). Values are stored
+    as given: callers which hand out mutable values should hand out copies.
+    """
+
+    def __init__(self, name, maxsize=None, maxbytes=None, policy="lru", tags=(), sizeof=sizeof):
+        if policy not in POLICIES:
+            raise ValueError(f"Policy must be one of {POLICIES}. Saw {policy!r}.")
+        self.name = name
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.policy = policy
+        self.tags = frozenset(tags)
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._data = OrderedDict()  # key -> (value, bytes), least recently used first
+        self._uses = {}  # lfu: key -> number of uses
+        self._heap = []  # lfu: (uses, order, key), stale entries are skipped
+        self._order = itertools.count()
+        self._lock = threading.RLock()
+        _caches[name] = self
+
+    def __repr__(self):
+        return f"<BoundedCache {self.name} ({self.policy}): {len(self)} entries, {self.nbytes} bytes>"
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Value for key (counted as a hit) or default (a miss)."""
+        if self.policy == "lru":
+            ## the hot path: no lock, an entry evicted between the lookup and the move is still returned
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                pass
+            return entry[0]
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._touch(key)
+            return entry[0]
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                self.nbytes -= self._data.pop(key)[1]
+            if self.maxbytes is not None and size > self.maxbytes:
+                self._uses.pop(key, None)
+                return  # would evict everything and still not fit
+            self._data[key] = (value, size)
+            self.nbytes += size
+            if self.policy == "lfu":
+                self._uses[key] = self._uses.get(key, 0)
+                self._touch(key)
+            self._evict(key)
+
+    def get_or_compute(self, key, function, *args, **kwargs):
+        """Value for key, calling function(*args, **kwargs) and storing its result on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = function(*args, **kwargs)
+            self[key] = value
+        return value
+
+    def _touch(self, key):
+        if self.policy == "lru":
+            self._data.move_to_end(key)
+        else:
+            self._uses[key] += 1
+            heapq.heappush(self._heap, (self._uses[key], next(self._order), key))
+            if len(self._heap) > 4 * len(self._data) + 64:
+                self._heap = [(n, next(self._order), k) for k, n in self._uses.items()]
+                heapq.heapify(self._heap)
+
+    def _over(self):
+        return ((self.maxsize is not None and len(self._data) > self.maxsize)
+                or (self.maxbytes is not None and self.nbytes > self.maxbytes))
+
+    def _evict(self, keep):
+        """Evict until within the bounds, never the entry keep which was just stored (it fits on its own)."""
+        while len(self._data) > 1 and self._over():
+            if self.policy == "lru":
+                key, (_, size) = self._data.popitem(last=False)
+            else:
+                kept = []
+                while True:
+                    entry = heapq.heappop(self._heap)
+                    uses, _, key = entry
+                    if key == keep:
+                        kept.append(entry)
+                    elif self._uses.get(key) == uses:
+                        break
+                for entry in kept:
+                    heapq.heappush(self._heap, entry)
+                del self._uses[key]
+                size = self._data.pop(key)[1]
+            self.nbytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (statistics are kept)."""
+        with self._lock:
+            self._data.clear()
+            self._uses.clear()
+            self._heap.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self._data),
+                'maxsize': self.maxsize, 'bytes': self.nbytes, 'maxbytes': self.maxbytes}
+
+
+def memoize(cache, key=None):
+    """Decorator looking calls up in cache, by key(*args, **kwargs) if given else by the positional arguments."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs) if key is not None else args
+            value = cache.get(k, _MISSING)
+            if value is _MISSING:
+                value = function(*args, **kwargs)
+                cache[k] = value
+            return value
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def invalidate(tag):
+    """Clear every cache tagged with tag, returns the names of the caches cleared."""
+    cleared = []
+    for cache in list(_caches.values()):
+        if tag in cache.tags:
+            cache.clear()
+            cleared.append(cache.name)
+    return cleared
+
+
+def caches() -> dict:
+    return dict(_caches)
+
+
+def stats() -> dict:
+    """{cache name: statistics} of every live cache."""
+    return {name: cache.stats() for name, cache in sorted(_caches.items())}
+
+
+metrics.register_provider(stats)
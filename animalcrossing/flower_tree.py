@@ -4,22 +4,70 @@ from .flowers.species import Species
 from .flowers.flower import Flower
 #from color import FlowerColor
 from .breeding import vizualizer
+from .breeding.sampling import FenwickSampler
 
 import random
 from collections import Counter
 
 
+class BestRepresentatives:
+    """The lowest generation parent of every flower (genotype) seen so far, updated as members join a tree.
+
+    Seed parents are always their genotype's representative. options holds one representative per genotype
+    (in order of first appearance) and sampler holds the seed dominated weights of those options: seed_weight
+    for seed genotypes, 1 for any other genotype when first seen plus 1 every time a lower generation
+    representative replaces the current one.
+    """
+
+    def __init__(self, seed_parents, seed_weight=1):
+        self.options = []
+        self.position = {}
+        self.seed_weight = seed_weight
+        self.sampler = FenwickSampler()
+        for parent in seed_parents:
+            self._add_option(parent, seed_weight)
+        self.num_seeds = len(self.options)
+
+    def _add_option(self, parent, weight):
+        self.position[parent.object] = len(self.options)
+        self.options.append(parent)
+        self.sampler.append(weight)
+
+    def add(self, parent):
+        i = self.position.get(parent.object)
+        if i is None:
+            self._add_option(parent, 1)
+        elif self.options[i].generation > parent.generation:
+            self.options[i] = parent
+            self.sampler.add(i, 1)
+
+    def set_seed_weight(self, seed_weight):
+        if seed_weight != self.seed_weight:
+            for i in range(self.num_seeds):
+                self.sampler.set(i, seed_weight)
+            self.seed_weight = seed_weight
+
+    def sample(self, rng=random):
+        return self.options[self.sampler.sample(rng)]
+
+
 class RandomFlowerChildren:
+    """Grows a random family tree from a species' seeds, every draw comes from rng (the random module by default)."""
 
-    def __init__(self, species):
+    def __init__(self, species, rng=random):
         self.species = species
+        self.rng = rng
         self.seed_parents = [Parent(f) for f in Flower.seeds(self.species)]
         self.unused_seeds = set(self.seed_parents)
-        p1 = random.choice(self.seed_parents)
-        p2 = random.choice(self.seed_parents)
+        p1 = rng.choice(self.seed_parents)
+        p2 = rng.choice(self.seed_parents)
         self.unused_seeds -= {p1,p2}
         #self.tree = FamilyTree.from_objects(p1, p2)
-        self.tree = FamilyTree(p1, p2)
+        self.tree = FamilyTree(p1, p2, rng=rng)
+        self.best = BestRepresentatives(self.seed_parents)
+        for parent in self.tree.members():
+            self.best.add(parent)
+        self.tree.listeners.append(self.best.add)
 
     def run_n_pairings(self, n):
         """Randomly grab from members of family tree or seed parents"""
@@ -28,10 +76,10 @@ class RandomFlowerChildren:
 
     def _random_pairing(self):
         members = self.tree.members()
-        members.extend(self.unused_seeds)
-        p1, p2 = random.sample(members, 2)
+        members.extend(p for p in self.seed_parents if p in self.unused_seeds)  # not the set, its order varies per run
+        p1, p2 = self.rng.sample(members, 2)
         self.unused_seeds -= {p1,p2}
-        p1.breed(p2)
+        p1.breed(p2, self.rng)
 
     def run_n_smart_pairings(self, n):
         """Only only breed with highest generation version of gene combination."""
@@ -39,18 +87,8 @@ class RandomFlowerChildren:
             self._run_smart_pairing()
 
     def _run_smart_pairing(self):
-        smart_members = {parent.object:parent for parent in self.seed_parents}
-        for parent in self.tree.members():
-            if parent.object not in smart_members:
-                smart_members[parent.object] = parent
-            #elif smart_members[parent.object].id > parent.id:
-            elif smart_members[parent.object].generation > parent.generation:
-                smart_members[parent.object] = parent
-
-        parent_options = list(smart_members.values())
-        p1, p2 = random.choices(parent_options, k=2)
-
-        p1.breed(p2)
+        p1, p2 = self.rng.choices(self.best.options, k=2)
+        p1.breed(p2, self.rng)
 
     def run_n_seed_dominated(self, n, f):
         """Only only breed with lowest generation version of gene combination, but start with f seeds of each color."""
@@ -58,23 +96,10 @@ class RandomFlowerChildren:
             self._run_n_seed_dominated(f)
 
     def _run_n_seed_dominated(self, f):
-        smart_members = {parent.object: parent for parent in self.seed_parents}
-        counts = {parent.object: f for parent in self.seed_parents}
-        for parent in self.tree.members():
-            if parent.object not in smart_members:
-                smart_members[parent.object] = parent
-                counts[parent.object] = 1
-            # elif smart_members[parent.object].id > parent.id:
-            elif smart_members[parent.object].generation > parent.generation:
-                smart_members[parent.object] = parent
-                counts[parent.object] += 1
-
-        ##relies on ordering of dicts.
-        parent_options = list(smart_members.values())
-        parent_weights = list(counts.values())
-        p1, p2 = random.choices(parent_options, weights=parent_weights, k=2)
-
-        p1.breed(p2)
+        self.best.set_seed_weight(f)
+        p1 = self.best.sample(self.rng)
+        p2 = self.best.sample(self.rng)
+        p1.breed(p2, self.rng)
 
     def expressed_colors(self):
         return set([m.object.color for m in self.tree.members()])
@@ -0,0 +1,181 @@
+"""
+Module for comparing the pairing strategies of
+flower_tree.RandomFlowerChildren over many independent trials.
+
+Each trial grows a new tree one pairing at a time and records
+the pairing on which each color and each genotype first appeared
+(0 for the flowers present before the first pairing). Trials are
+split into chunks which run across a process pool; every trial
+draws from its own random stream (random_streams.python_random of
+seed, species, strategy and trial number) so results are bit-identical
+however trials are spread over the workers.
+Workers only send back aggregated histograms (TrialSummary) so memory
+does not grow with the number of trials.
+
+pairings_sampler adapts run_trial to time.adaptive_monte_carlo, which
+runs trials until the quantiles of the pairings to a color or genotype
+are known to a requested precision.
+
+Running as a main/script compares the three strategies for tulips
+and prints the median and 95th percentile pairings to each color.
+"""
+from collections import Counter
+import multiprocessing as mp
+import random
+
+import numpy as np
+import pandas as pd
+
+from . import random_streams
+from .flower_tree import RandomFlowerChildren
+from .flowers.flower import Flower
+from .flowers.species import Species
+
+STRATEGIES = ("pairings", "smart", "seed_dominated")
+
+
+class TrialSummary:
+    """Histograms of the pairing on which each color/genotype first appeared, merged over many trials.
+
+    first_seen[key] counts trials by pairing number, missing[key] counts trials that ended before key appeared.
+    Keys are FlowerColor or Flower (genotype) objects.
+    """
+
+    def __init__(self, species, strategy):
+        self.species = species
+        self.strategy = strategy
+        self.trials = 0
+        self.first_seen = {}
+        self.missing = Counter()
+
+    def __repr__(self):
+        return f"<TrialSummary {self.species.name} {self.strategy}: {self.trials} trials>"
+
+    def add_trial(self, first_seen: dict, keys):
+        self.trials += 1
+        for key in keys:
+            if key in first_seen:
+                self.first_seen.setdefault(key, Counter())[first_seen[key]] += 1
+            else:
+                self.missing[key] += 1
+
+    def merge(self, other):
+        self.trials += other.trials
+        for key, counts in other.first_seen.items():
+            self.first_seen.setdefault(key, Counter()).update(counts)
+        self.missing.update(other.missing)
+        return self
+
+    def found(self, key):
+        return sum(self.first_seen.get(key, {}).values())
+
+    def quantile(self, key, q):
+        """Pairings needed for key to appear in fraction q of all trials, None if that many trials never saw it."""
+        target = q * self.trials
+        cum = 0
+        for pairing, count in sorted(self.first_seen.get(key, {}).items()):
+            cum += count
+            if cum >= target:
+                return pairing
+        return None
+
+    def mean(self, key):
+        """Mean pairings to appear over the trials which saw key."""
+        counts = self.first_seen.get(key, {})
+        n = sum(counts.values())
+        return sum(k * v for k, v in counts.items()) / n if n else float('nan')
+
+    def to_frame(self, alphas=(0.5, 0.95)):
+        rows = []
+        for key in self.first_seen.keys() | self.missing.keys():
+            kind = "genotype" if isinstance(key, Flower) else "color"
+            name = key.gene_str() if isinstance(key, Flower) else key.name
+            row = [self.species.name, self.strategy, kind, name, self.found(key) / self.trials, self.mean(key)]
+            row.extend(self.quantile(key, a) for a in alphas)
+            rows.append(row)
+        header = ["Species", "Strategy", "Kind", "Key", "Found", "Mean"] + [f"Pairings (alpha={a})" for a in alphas]
+        return pd.DataFrame(rows, columns=header).sort_values(["Kind", "Key"], ignore_index=True)
+
+
+def run_trial(species, strategy, max_pairings=100, f=1, rng=random):
+    """Grow one tree with the strategy and return {color or genotype: first pairing it appeared on}.
+
+    Draws from rng (a random.Random, the global random module by default). Stops early once every genotype
+    has appeared.
+    """
+    rfc = RandomFlowerChildren(species, rng)
+    first_seen = {}
+    pairing = 0
+
+    def record(parent):
+        first_seen.setdefault(parent.object, pairing)
+        first_seen.setdefault(parent.object.color, pairing)
+
+    for member in rfc.tree.members():
+        record(member)
+    rfc.tree.listeners.append(record)
+    num_genotypes = 3 ** len(rfc.seed_parents[0].object.genes)
+    steps = {"pairings": rfc._random_pairing,
+             "smart": rfc._run_smart_pairing,
+             "seed_dominated": lambda: rfc._run_n_seed_dominated(f)}
+    step = steps[strategy]
+    while pairing < max_pairings and sum(isinstance(k, Flower) for k in first_seen) < num_genotypes:
+        pairing += 1
+        step()
+    return first_seen
+
+
+def pairings_sampler(species, strategy, key, max_pairings=100, f=1):
+    """Sampler (see time.adaptive_monte_carlo) of the pairing on which key first appeared, np.inf if it did not."""
+    def sample(n, rng):
+        pairings = np.full(n, np.inf)
+        for i in range(n):
+            first_seen = run_trial(species, strategy, max_pairings, f, random.Random(int(rng.integers(2 ** 63))))
+            if key in first_seen:
+                pairings[i] = first_seen[key]
+        return pairings
+    return sample
+
+
+def _run_chunk(args):
+    species, strategy, trials, max_pairings, f, seed = args
+    keys = list(Flower.colors(species)) + Flower.genotypes(species)
+    summary = TrialSummary(species, strategy)
+    for trial in trials:
+        rng = random_streams.python_random(seed, species, strategy, trial)
+        summary.add_trial(run_trial(species, strategy, max_pairings, f, rng), keys)
+    return summary
+
+
+def run_trials(species_list, strategies=STRATEGIES, trials=1000, max_pairings=100, f=1, seed=0,
+               processes=None, chunk_size=50) -> dict:
+    """Run trials independent trials for every species and strategy, return {(species, strategy): TrialSummary}.
+
+    processes is passed to multiprocessing.Pool (None uses every cpu), processes=1 runs in this process.
+    """
+    tasks = [(species, strategy, range(start, min(start + chunk_size, trials)), max_pairings, f, seed)
+             for species in species_list for strategy in strategies for start in range(0, trials, chunk_size)]
+    summaries = {(species, strategy): TrialSummary(species, strategy)
+                 for species in species_list for strategy in strategies}
+    if processes == 1:
+        partials = map(_run_chunk, tasks)
+        for partial in partials:
+            summaries[(partial.species, partial.strategy)].merge(partial)
+    else:
+        with mp.Pool(processes) as pool:
+            for partial in pool.imap_unordered(_run_chunk, tasks):
+                summaries[(partial.species, partial.strategy)].merge(partial)
+    return summaries
+
+
+if __name__ == "__main__":
+    import time
+
+    start_time = time.perf_counter()
+    results = run_trials([Species.TULIP], trials=500, max_pairings=150)
+    print(f"Took {time.perf_counter() - start_time:.1f} seconds")
+    for (species, strategy), summary in results.items():
+        df = summary.to_frame()
+        print(summary)
+        print(df[df["Kind"] == "color"].to_string(index=False))
+        print()
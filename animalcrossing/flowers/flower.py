@@ -21,7 +21,10 @@ from dataclasses import dataclass
 from .species import Species
 from .genes import Gene
 from .color import FlowerColor
+from .. import cache
+from .. import metrics
 import pandas as pd
+import random
 import re
 import itertools
 
@@ -31,6 +34,8 @@ _resource_name = "FlowerGenes.xlsx"
 _gene_table = None
 _gene_map = None 
 implicit_init = True
+## child distributions of Flower.breeding_probabilities by (flower, flower), cleared by init
+_breeding_cache = cache.BoundedCache("flower.breeding_probabilities", maxsize=100000, tags=("heredity",))
 
 def _convert_types(row):
     species = Species[row["Species"].upper()]  # species specified as text
@@ -53,7 +58,9 @@ def init():
     qq = _gene_table.apply(_convert_types, axis=1, result_type="expand").rename(columns={0: "Key", 1: "ColorValue"})
     _gene_table[["Key", "ColorValue"]] = qq
     _gene_map = {k: v for k, v in zip(_gene_table['Key'], _gene_table['ColorValue'])}
+    cache.invalidate("heredity")
 
+@metrics.timed("flower.resolve_color")
 def _resolve_color(species, genes) -> FlowerColor:
     if implicit_init and not _gene_map:
         init()
@@ -66,7 +73,7 @@ def _species_seeds(species):
     return t.values
 
 def _species_colors(species):
-    if implicit_init and not _gene_table:
+    if implicit_init and _gene_table is None:
         init()
     return set(_gene_table.loc[(_gene_table['Species'].str.upper() == species.name), "ColorValue"].values)
 
@@ -116,18 +123,36 @@ class Flower:
         genes = tuple(Gene(int(ni)) for ni in nums)
         return cls(species, genes, Flower.resolve_color(species, genes))
 
+    def genotype_code(self) -> int:
+        """Genes read as one base 3 number, e.g. genes 1,2,0 -> 1*9 + 2*3 + 0 = 15."""
+        return int(self._ternary_string(), 3)
+
+    @classmethod
+    def from_genotype_code(cls, species, code):
+        """Inverse of genotype_code."""
+        num_genes = 4 if species == Species.ROSE else 3
+        genes = [(code // 3**i) % 3 for i in reversed(range(num_genes))]
+        return cls.from_species_genes(species, genes)
+
     def duplicate(self):
         return Flower(self.species, self.genes, self.color)
 
-    def breed(self, other):
-        child_genes = tuple(a.breed(b) for a, b in zip(self.genes, other.genes))
+    @metrics.timed("flower.breed")
+    def breed(self, other, rng=random):
+        """Random child of this flower and other, drawing from rng (the random module by default)."""
+        child_genes = tuple(a.breed(b, rng) for a, b in zip(self.genes, other.genes))
         child_color = Flower.resolve_color(self.species, child_genes)
         return Flower(self.species, child_genes, child_color)
 
     def mixing_probabilities(self, other):
         return tuple(a.mixing_probabilities(b) for a, b in zip(self.genes, other.genes))
 
+    @metrics.timed("flower.breeding_probabilities")
     def breeding_probabilities(self, other):
+        """{child Flower: probability} of breeding with other (a new dict, the result is cached)."""
+        return dict(_breeding_cache.get_or_compute((self, other), self._breeding_probabilities, other))
+
+    def _breeding_probabilities(self, other):
         probs = self.mixing_probabilities(other)
         for prob in probs:
             prob.trim_zeros()
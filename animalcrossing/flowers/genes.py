@@ -11,7 +11,9 @@ from Gene.
 
 The randomness from this module draws from the standard python 
 random module and a call to random.seed() can be done to 
-guarantee reproducible results. 
+guarantee reproducible results. Functions which draw also take an
+rng argument (a random.Random, e.g. from animalcrossing.random_streams)
+to draw from an independent stream instead.
 
 If called as a main script, this module prints the probabilities 
 of all possible combinations of parent pairs and randomly draws 
@@ -40,15 +42,13 @@ class Gene(IntEnum):
     Xx = 1
     XX = 2
 
-    def breed(self, other):
+    def breed(self, other, rng=random):
         """
-        Return a dict of the probabilty after mixing this Gene with other. 
-        
-        Returns a dict (MixingProbabilities) whose keys, value 
-        pairs are the gene, probability of a child's 
-        after breeding this with another Gene.
+        Return a random child Gene after mixing this Gene with other,
+        drawn from the probabilities of mixing_probabilities(other)
+        using rng (the random module by default).
         """
-        return self.mixing_probabilities(other).select_random()
+        return self.mixing_probabilities(other).select_random(rng)
 
     def mixing_probabilities(self, other):
         return mixing_probabilities(self, other)
@@ -129,14 +129,14 @@ class GeneProbabilities(dict):
         for k in to_delete:
             del self[k]
 
-    def select_random(self):
+    def select_random(self, rng=random):
         """
         Select a random child Gene using the probabilities defined by this 
-        dict. 
+        dict, drawing from rng (the random module by default).
         """
         assert self._is_valid(), "Probabilities are not a valid pmf."
         #enumeration makes use of the guaranteed order of dict and the ordinal values from Gene.
-        r = random.random()
+        r = rng.random()
         for i, v in enumerate(itertools.accumulate(self.values())):
             if r <= v:
                 return Gene(i)
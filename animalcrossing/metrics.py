@@ -0,0 +1,123 @@
+"""
+Lightweight call counts, timings and cache statistics for the
+package's hot paths, off unless turned on at runtime.
+
+    from animalcrossing import metrics
+    metrics.enable()
+    ...                         # run something
+    print(metrics.to_json())    # or metrics.export("metrics.json")
+
+Functions decorated with timed(name) count their calls and cumulative
+time while metrics are enabled. The timing wrappers are only installed
+(in place of the functions in their module or class) by enable() and
+the plain functions are put back by disable(), so a disabled hot path
+runs exactly as if it were not instrumented. Cache statistics come from
+providers registered with register_provider and are read when a
+snapshot is taken.
+
+Instrumented names are dotted module.function paths, e.g.
+flower.resolve_color, probability_chain.exaustive_enumeration,
+shortest_path.shortest_paths, analytic_approximation.pmf_for and
+expected_breeding_time.time_n_pairs. The statistics of every
+cache.BoundedCache are included under the cache's name.
+"""
+import functools
+import json
+import sys
+import time
+
+enabled = False
+
+_calls = {}  # name -> [calls, seconds]
+_instrumented = []  # (function, timing wrapper) of every timed function
+_providers = []  # callables returning {name: {'hits':..., 'misses':...}}
+
+
+def enable(on=True):
+    """Turn metrics on (or off), installing the timing wrappers (or the plain functions)."""
+    global enabled
+    enabled = on
+    for function, wrapper in _instrumented:
+        _install(function, wrapper if on else function)
+
+
+def disable():
+    enable(False)
+
+
+def reset():
+    """Forget all counts (providers keep their own statistics)."""
+    _calls.clear()
+
+
+def _install(function, replacement):
+    """Bind replacement to function's name in its module or class."""
+    owner = sys.modules[function.__module__]
+    *path, name = function.__qualname__.split(".")
+    for part in path:
+        owner = getattr(owner, part)
+    setattr(owner, name, replacement)
+
+
+def timed(name):
+    """Decorator counting calls of a function and the time spent in them under name, while enabled.
+
+    Only module level functions and methods of module level classes can be swapped in and out, anything else
+    (e.g. a function defined in another function) keeps a wrapper which checks whether metrics are enabled.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+
+        if "<locals>" in function.__qualname__:
+            @functools.wraps(function)
+            def checking(*args, **kwargs):
+                return wrapper(*args, **kwargs) if enabled else function(*args, **kwargs)
+            return checking
+        _instrumented.append((function, wrapper))
+        return wrapper if enabled else function
+    return decorator
+
+
+def record(name, seconds, calls=1):
+    entry = _calls.get(name)
+    if entry is None:
+        entry = _calls[name] = [0, 0.0]
+    entry[0] += calls
+    entry[1] += seconds
+
+
+def register_provider(provider):
+    """provider() returns {name: {'hits': int, 'misses': int, ...}}, merged into every snapshot's caches."""
+    _providers.append(provider)
+    return provider
+
+
+def _cache_entry(hits, misses, **extra):
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else None, **extra}
+
+
+def snapshot() -> dict:
+    """{'enabled': bool, 'calls': {name: {...}}, 'caches': {name: {...}}} of everything recorded so far."""
+    calls = {name: {'calls': n, 'seconds': s, 'mean_seconds': s / n if n else None}
+             for name, (n, s) in sorted(_calls.items())}
+    caches = {}
+    for provider in _providers:
+        caches.update({name: _cache_entry(**stats) for name, stats in provider().items()})
+    return {'enabled': enabled, 'calls': calls, 'caches': dict(sorted(caches.items()))}
+
+
+def to_json(indent=2) -> str:
+    return json.dumps(snapshot(), indent=indent)
+
+
+def export(path, indent=2):
+    with open(path, 'w') as f:
+        f.write(to_json(indent))
+        f.write("\n")
@@ -0,0 +1,55 @@
+"""
+Independent, reproducible random streams for the package's simulations.
+
+Every stochastic function takes an rng: the flower, gene, lineage and
+pure python simulations draw from a random.Random (default the global
+random module), the numpy simulations of animalcrossing.time from a
+numpy Generator (or anything np.random.default_rng accepts).
+
+A stream is identified by a seed and a path of keys, e.g.
+(seed, species, strategy, trial). The keys become the spawn key of a
+numpy SeedSequence, the same construction SeedSequence.spawn uses, so
+streams with different keys are statistically independent and a stream
+only depends on its own keys. Giving every trial its own stream keyed
+by its trial number makes results bit-identical no matter how trials
+are split over worker processes.
+
+Keys may be integers or strings (hashed to integers), enums use their
+name.
+"""
+import enum
+import hashlib
+import random
+
+import numpy as np
+
+
+def _key(key) -> int:
+    if isinstance(key, enum.Enum):
+        key = key.name
+    if isinstance(key, str):
+        return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], 'little')
+    return int(key)
+
+
+def seed_sequence(seed, *keys) -> np.random.SeedSequence:
+    """SeedSequence of the stream for seed and the path of keys."""
+    if isinstance(seed, np.random.SeedSequence):
+        return np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + tuple(_key(k) for k in keys))
+    return np.random.SeedSequence(_key(seed), spawn_key=tuple(_key(k) for k in keys))
+
+
+def python_random(seed, *keys) -> random.Random:
+    """random.Random for the stream, for the functions which take a random module like rng."""
+    state = seed_sequence(seed, *keys).generate_state(4, np.uint64)
+    return random.Random(int.from_bytes(state.tobytes(), 'little'))
+
+
+def numpy_generator(seed, *keys) -> np.random.Generator:
+    """numpy Generator for the stream, for the vectorized simulations."""
+    return np.random.default_rng(seed_sequence(seed, *keys))
+
+
+def spawn(seed, n, *keys) -> list:
+    """SeedSequences of n independent child streams 0..n-1 of (seed, *keys), e.g. one per worker."""
+    return [seed_sequence(seed, *keys, i) for i in range(n)]
@@ -0,0 +1,79 @@
+"""
+Tests for animalcrossing.cache.BoundedCache: eviction policies,
+byte bounds, statistics and invalidation.
+
+Run with pytest.
+"""
+import numpy as np
+import pytest
+
+from animalcrossing import cache
+from animalcrossing.cache import BoundedCache, memoize
+
+
+def test_lru_evicts_least_recently_used():
+    c = BoundedCache("test_cache.lru", maxsize=2)
+    c["a"], c["b"] = 1, 2
+    assert c["a"] == 1
+    c["c"] = 3
+    assert "b" not in c and "a" in c and "c" in c
+    assert c.stats()['evictions'] == 1
+
+
+def test_lfu_evicts_least_frequently_used():
+    c = BoundedCache("test_cache.lfu", maxsize=2, policy="lfu")
+    c["a"], c["b"] = 1, 2
+    for _ in range(3):
+        c.get("b")
+    c.get("a")
+    c["c"] = 3  # never evicts the entry just stored, a was read once and b three times
+    assert "a" not in c and "b" in c and "c" in c
+    c["d"] = 4  # c was never read, b has been read three times
+    assert sorted(c._data) == ["b", "d"]
+
+
+def test_maxbytes():
+    c = BoundedCache("test_cache.bytes", maxbytes=3 * 8000 + 500)
+    for i in range(5):
+        c[i] = np.zeros(1000)  # 8000 bytes of data each
+    assert list(c._data) == [2, 3, 4]
+    assert c.nbytes <= c.maxbytes
+    c["big"] = np.zeros(10000)  # larger than the whole cache, not stored
+    assert "big" not in c and len(c) == 3
+
+
+def test_stats_and_get_or_compute():
+    c = BoundedCache("test_cache.stats")
+    calls = []
+    for _ in range(3):
+        assert c.get_or_compute("k", lambda: calls.append(1) or 5) == 5
+    assert len(calls) == 1
+    assert c.get("missing", "default") == "default"
+    with pytest.raises(KeyError):
+        c["missing"]
+    stats = c.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (2, 3, 1)
+    assert cache.stats()["test_cache.stats"] == stats
+
+
+def test_memoize_and_invalidate():
+    c = BoundedCache("test_cache.memoize", tags=("test_cache",))
+    other = BoundedCache("test_cache.other", tags=("rules",))
+    calls = []
+
+    @memoize(c)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert [square(3), square(3), square(4)] == [9, 9, 16]
+    assert calls == [3, 4] and square.cache is c
+    other["x"] = 1
+    assert cache.invalidate("test_cache") == ["test_cache.memoize"]
+    assert len(c) == 0 and "x" in other
+    assert square(3) == 9 and calls == [3, 4, 3]
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        BoundedCache("test_cache.bad", policy="fifo")
@@ -0,0 +1,60 @@
+"""
+Tests for animalcrossing.metrics: timing wrappers are only in place
+while metrics are enabled.
+
+Run with pytest.
+"""
+import json
+
+import pytest
+
+from animalcrossing import metrics
+from animalcrossing.cache import BoundedCache
+from animalcrossing.flowers.flower import Flower
+from animalcrossing.flowers.species import Species
+
+
+@pytest.fixture
+def recording():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def breed_seeds():
+    seed1, seed2 = Flower.seeds(Species.TULIP)[:2]
+    return seed1.breed(seed2)
+
+
+def test_disabled_runs_plain_functions():
+    assert not metrics.enabled
+    assert not hasattr(Flower.breed, "__wrapped__")
+    metrics.reset()
+    breed_seeds()
+    assert metrics.snapshot()['calls'] == {}
+
+
+def test_enable_installs_and_disable_restores(recording):
+    plain = Flower.breed.__wrapped__
+    breed_seeds()
+    breed_seeds()
+    snapshot = metrics.snapshot()
+    assert snapshot['enabled']
+    assert snapshot['calls']['flower.breed']['calls'] == 2
+    metrics.disable()
+    assert Flower.breed is plain
+    breed_seeds()
+    assert metrics.snapshot()['calls']['flower.breed']['calls'] == 2
+
+
+def test_cache_statistics_in_snapshot(recording, tmp_path):
+    cache = BoundedCache("test_metrics.cache", maxsize=1)
+    cache["a"] = 1
+    cache.get("a")
+    cache.get("b")
+    path = tmp_path / "metrics.json"
+    metrics.export(path)
+    entry = json.loads(path.read_text())['caches']["test_metrics.cache"]
+    assert (entry['hits'], entry['misses'], entry['hit_rate']) == (1, 1, 0.5)
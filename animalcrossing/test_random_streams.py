@@ -0,0 +1,47 @@
+"""
+Tests for animalcrossing.random_streams and the per trial streams of
+flower_trials.
+
+Run with pytest.
+"""
+import numpy as np
+
+from animalcrossing import flower_trials, random_streams
+from animalcrossing.flowers.species import Species
+
+
+def test_same_keys_same_stream():
+    a = random_streams.python_random(0, Species.TULIP, "smart", 3)
+    b = random_streams.python_random(0, "TULIP", "smart", 3)  # enums are keyed by name
+    assert [a.random() for _ in range(5)] == [b.random() for _ in range(5)]
+    assert np.array_equal(random_streams.numpy_generator(7, "x").random(5),
+                          random_streams.numpy_generator(7, "x").random(5))
+
+
+def test_different_keys_different_streams():
+    draws = {tuple(random_streams.python_random(seed, *keys).random() for _ in range(3))
+             for seed, keys in [(0, ()), (1, ()), (0, (0,)), (0, (1,)), (0, (0, 1)), (0, (1, 0))]}
+    assert len(draws) == 6
+
+
+def test_spawn_matches_keyed_streams():
+    children = random_streams.spawn(5, 4, "worker")
+    assert len({tuple(np.random.default_rng(c).integers(2 ** 32, size=3)) for c in children}) == 4
+    for i, child in enumerate(children):
+        assert np.array_equal(np.random.default_rng(child).random(3),
+                              random_streams.numpy_generator(5, "worker", i).random(3))
+    ## a spawned SeedSequence can seed further streams
+    grandchild = random_streams.seed_sequence(children[1], 2)
+    assert grandchild.spawn_key == random_streams.seed_sequence(5, "worker", 1, 2).spawn_key
+
+
+def histograms(summaries):
+    return {key: (summary.trials, summary.first_seen, summary.missing) for key, summary in summaries.items()}
+
+
+def test_trials_independent_of_chunking():
+    kwargs = dict(species_list=[Species.TULIP], strategies=("pairings",), trials=12, max_pairings=15, seed=3)
+    one_chunk = flower_trials.run_trials(**kwargs, processes=1, chunk_size=12)
+    small_chunks = flower_trials.run_trials(**kwargs, processes=1, chunk_size=5)
+    two_workers = flower_trials.run_trials(**kwargs, processes=2, chunk_size=5)
+    assert histograms(one_chunk) == histograms(small_chunks) == histograms(two_workers)
@@ -0,0 +1,149 @@
+"""
+Monte Carlo quantiles which sample until they are as precise as asked.
+
+A sampler is any function sampler(n, rng) returning n independent
+integer outcomes (days, pairings, ...) as a numpy array, np.inf for a
+trial which never finished. estimate_quantiles draws batches, doubling
+the total each time, into a histogram (so memory does not grow with
+the number of samples) until the confidence interval of every requested
+quantile is narrow enough, or max_samples is reached. A quantile whose
+lower bound is already np.inf lies among the unfinished trials: it is
+reported as beyond the horizon and needs no more samples, while an
+interval with only its upper bound np.inf is never narrow enough.
+
+The intervals are distribution free: for the q quantile of n samples the
+interval between the order statistics of ranks l and u, where l and u
+are the confidence/2 lower and upper quantiles of a Binomial(n, q),
+covers the true quantile with at least the given confidence.
+
+pair_sampler, cloning_sampler and plan_sampler adapt the simulators of
+monte_carlo, cloning and plan_simulator; flower_trials.pairings_sampler
+adapts the flower tree trials.
+
+Running as a main/script estimates the 50% and 95% quantiles for a few
+px to within 5% and prints how many samples each needed.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import scipy.stats
+
+from . import cloning
+from . import monte_carlo
+
+
+@dataclass
+class QuantileEstimate:
+    """Estimated quantiles of a sampler with their confidence intervals (np.inf if not bounded yet).
+
+    beyond_horizon marks the quantiles which even their lower bound puts among the unfinished trials.
+    """
+    alphas: np.ndarray
+    estimates: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+    samples: int
+    converged: bool
+    beyond_horizon: np.ndarray
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({"Estimate": self.estimates, "Lower": self.lower, "Upper": self.upper,
+                             "Beyond horizon": self.beyond_horizon},
+                            index=pd.Index(self.alphas, name="alpha"))
+
+
+class Histogram:
+    """Counts of integer outcomes plus the number of trials which never finished (np.inf)."""
+
+    def __init__(self):
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.unfinished = 0
+        self.trials = 0
+
+    def add(self, samples):
+        samples = np.asarray(samples)
+        finite = np.isfinite(samples)
+        counts = np.bincount(samples[finite].astype(np.int64))
+        if len(counts) > len(self.counts):
+            counts, self.counts = self.counts, counts
+        self.counts[:len(counts)] += counts
+        self.unfinished += int(np.count_nonzero(~finite))
+        self.trials += samples.size
+
+    def order_statistic(self, rank):
+        """Value of the rank-th smallest sample (1-based, rank may be an array), np.inf past the finished ones."""
+        rank = np.asarray(rank)
+        cum = np.cumsum(self.counts)
+        finished = cum[-1] if cum.size else 0
+        value = np.searchsorted(cum, np.maximum(rank, 1)).astype(float)
+        return np.where(rank > finished, np.inf, value)
+
+    def quantiles(self, alphas, confidence=0.95):
+        """Quantile estimates and lower and upper confidence bounds for every alpha."""
+        alphas = np.asarray(alphas, dtype=float)
+        n = self.trials
+        tail = (1.0 - confidence) / 2
+        estimate = self.order_statistic(np.ceil(alphas * n))
+        lower_rank = scipy.stats.binom.ppf(tail, n, alphas)
+        lower = np.where(lower_rank < 1, 0.0, self.order_statistic(lower_rank))  # outcomes are never negative
+        upper_rank = scipy.stats.binom.ppf(1.0 - tail, n, alphas) + 1
+        upper = np.where(upper_rank > n, np.inf, self.order_statistic(upper_rank))
+        return estimate, lower, upper
+
+
+def resolved(estimate, lower, upper, rel_width=0.05, abs_width=1):
+    """Which quantiles need no more samples: beyond the horizon (lower is np.inf) or narrow enough and finite."""
+    beyond = np.isinf(lower)
+    bounded = ~beyond & np.isfinite(upper)
+    width = np.where(bounded, upper - np.where(bounded, lower, 0.0), np.inf)
+    return beyond | (width <= np.maximum(abs_width, rel_width * np.where(bounded, estimate, 0.0)))
+
+
+def estimate_quantiles(sampler, alphas=(0.5, 0.95), rel_width=0.05, abs_width=1, confidence=0.95,
+                       batch_size=1000, max_samples=10000000, rng=None) -> QuantileEstimate:
+    """Sample until every alpha quantile's interval is at most max(abs_width, rel_width * estimate) wide
+    or lies beyond the horizon (see resolved)."""
+    rng = np.random.default_rng(rng)
+    alphas = np.asarray(alphas, dtype=float)
+    histogram = Histogram()
+    n = batch_size
+    while True:
+        histogram.add(sampler(n, rng))
+        estimate, lower, upper = histogram.quantiles(alphas, confidence)
+        converged = bool(np.all(resolved(estimate, lower, upper, rel_width, abs_width)))
+        if converged or histogram.trials >= max_samples:
+            return QuantileEstimate(alphas, estimate, lower, upper, histogram.trials, converged, np.isinf(lower))
+        n = min(histogram.trials, max_samples - histogram.trials)
+
+
+def pair_sampler(px, num_pairs=1, rules=None):
+    """Days until the first of num_pairs fresh pairs produces X (probability px per child)."""
+    def sample(n, rng):
+        days = monte_carlo.simulate_pair_progeny(px, n * num_pairs, rng, rules=rules)
+        return days.reshape(n, num_pairs).min(axis=1)
+    return sample
+
+
+def cloning_sampler(x, starters=1, rules=None):
+    """Days until starters fresh flowers have cloned to at least x flowers."""
+    def sample(n, rng):
+        return cloning.simulate_clone_times(x, n, starters, rng, rules)
+    return sample
+
+
+def plan_sampler(plan):
+    """Total days of a plan_simulator.BreedingPlan."""
+    def sample(n, rng):
+        return plan.sample(n, rng).sum(axis=1)
+    return sample
+
+
+if __name__ == "__main__":
+    import time
+
+    for px in [0.25, 0.0625, 0.015625, 0.00390625]:
+        start_time = time.perf_counter()
+        result = estimate_quantiles(pair_sampler(px), rng=1)
+        print(f"px={px}: {result.samples} samples in {time.perf_counter() - start_time:.2f} seconds")
+        print(result.to_frame().to_string())
@@ -12,6 +12,9 @@ Maybe should fix the way ApproximatePMF.__init__ handles some fields that
 a caller doesn't want to setup themselves.
 Currently, module level "factory" method 'create_approximate_pmf(px, days, probabilities, day_cut=40)'
 accomplishes this. 
+
+load() only has the px values in ProbabilityMassFunctions.csv, pmf_for(px)
+computes a PMF for any px on demand (and caches it).
 """
 import pandas as pd
 import numpy as np
@@ -20,23 +23,42 @@ import scipy.stats
 import scipy.special
 
 import collections
+import importlib.resources
 from dataclasses import dataclass, field
-import itertools
+
+from . import watering_chain
+from .. import metrics
+from ..cache import BoundedCache, memoize
+from .rules import DEFAULT_RULES
+
+PMF_CACHE_SIZE = 1024
+
+def _as_days(day) -> np.ndarray:
+    """day (a number or array) as an integer array, TypeError unless every value is a whole number."""
+    day = np.asarray(day)
+    if day.dtype.kind in "iu":
+        return day
+    if day.dtype.kind == "f" and np.all(np.isfinite(day)) and np.all(day == np.floor(day)):
+        return day.astype(np.int64)
+    raise TypeError(f"Days must be whole numbers (ints or integral floats). Saw: {day}")
+
 
 @dataclass
 class ApproximatePMF:
     """The two parents have probability px of producing a child
-    every time they breed. Is callable with single arg day, e.g.
-    approxPMF(5) = 0.25.
+    every time they breed. Is callable with single arg day (or a
+    numpy array of days), e.g. approxPMF(5) = 0.25.
     
-    MUST be able to find and load ""ProbabilityMassFunctions.csv""
-    TO DO fix import as a resource/as part of animalcrossing module. 
+    load() reads ""ProbabilityMassFunctions.csv"" as a resource
+    of animalcrossing.time (or from a given path).
     
     The probability of producing child X on a certain day, but not 
     before is calculated exactly up to a certain number of days
     (at least 40) and continued exactly after the last 
     day using a fit exponential of the form exp(-m*d+c) where 
-    m and c are fit constants and d is the day. 
+    m and c are fit constants and d is the day. Cumulative sums
+    of the exact part are computed once, sums over and quantiles in
+    the exponential tail are geometric series evaluated in closed form.
     
     Useful to answer the question "How long do I expect to 
     have to wait before producing a flower of a specific color
@@ -52,38 +74,78 @@ class ApproximatePMF:
 
     def __post_init__(self):
         self.max_days = max(self.exact_pmf.keys())
+        self._pmf = np.array([self.exact_pmf[d] for d in range(1, self.max_days + 1)], dtype=float)
+        self._cum = np.cumsum(self._pmf)
+        self._ratio = np.exp(self.slope)  # p(d+1)/p(d) in the tail
+        self._first_tail_p = exp_func(self.max_days + 1, self.slope, self.intercept)
 
+    @metrics.timed("analytic_approximation.ApproximatePMF.__call__")
     def __call__(self, *args, **kwargs):
-        day = args[0]
-        if day <= 0:
+        """Probability on day (an int or an array of days, integral floats such as 5.0 are accepted)."""
+        day = _as_days(args[0])
+        if np.any(day <= 0):
             raise ValueError(f"First argument day should be positive strictly positive. Saw: {day}")
-        if day <= self.max_days:
-            p = self.exact_pmf[day]
-        else:
-            p = exp_func(day, self.slope, self.intercept)
-        return p
+        exact = self._pmf[np.minimum(day, self.max_days) - 1]
+        p = np.where(day <= self.max_days, exact, exp_func(day, self.slope, self.intercept))
+        return float(p) if p.ndim == 0 else p
 
     def p(self,day):
         return self(day)
 
+    def _cumulative(self, d):
+        """Sum of the PMF over days 1..d (d an int or array, not capped at 1), the tail in closed form."""
+        d = _as_days(d)
+        exact = self._cum[np.clip(d, 1, self.max_days) - 1]
+        exact = np.where(d >= 1, exact, 0.0)
+        beyond = np.maximum(d - self.max_days, 0)
+        tail = self._first_tail_p * (1.0 - self._ratio ** beyond) / (1.0 - self._ratio)
+        return exact + tail
+
     def cum_p(self,d):
-        return min(1.0, sum(self.pmf(d)))
+        c = np.minimum(1.0, self._cumulative(d))
+        return float(c) if c.ndim == 0 else c
 
     def pmf(self,toDay):
-        days = list(range(1,toDay+1))
-        return days, [self(di) for di in days]
+        days = np.arange(1,toDay+1)
+        return days, self(days)
 
     def cdf(self,toDay):
-        days, pmf = self.pmf(toDay)
-        return days, [min(1.0, pi) for pi in itertools.accumulate(pmf)]
+        days = np.arange(1,toDay+1)
+        return days, np.minimum(1.0, self._cumulative(days))
 
+    @metrics.timed("analytic_approximation.ApproximatePMF.quantile")
     def quantile(self, q):
-        cum = 0.0
-        day = 0
-        while cum < q:
-            day += 1
-            cum += self(day)
-        return day
+        """First day the cumulative probability reaches q (q may be an array), ValueError if it never does."""
+        q = np.asarray(q, dtype=float)
+        scalar = q.ndim == 0
+        q = np.atleast_1d(q)
+        day = np.searchsorted(self._cum, q) + 1  # first day with cum >= q, max_days+1 if beyond
+        remaining = q - self._cum[-1]
+        beyond = remaining > 0
+        if np.any(beyond):
+            ## solve first_tail_p * (1 - r^n) / (1 - r) >= remaining for the smallest n
+            left = 1.0 - remaining[beyond] * (1.0 - self._ratio) / self._first_tail_p
+            if np.any(left <= 0):
+                raise ValueError(f"Cumulative probability of px={self.px} never reaches {q[beyond][left <= 0]}.")
+            n = np.maximum(np.ceil(np.log(left) / np.log(self._ratio)), 1).astype(int)
+            day[beyond] = self.max_days + n
+            ## guard the rounding of the logarithms
+            short = self._cumulative(day) < q
+            day[short] += 1
+            early = beyond & (day > self.max_days + 1) & (self._cumulative(day - 1) >= q)
+            day[early] -= 1
+        return int(day[0]) if scalar else day
+
+    def moments(self, k=4):
+        """Raw moments E[T^1..T^k] of the day T, the exponential tail summed in closed form."""
+        days = np.arange(1, self.max_days + 1, dtype=float)
+        exact = [self._pmf @ days ** j for j in range(1, k + 1)]
+        tail = self._first_tail_p * watering_chain.geometric_power_sums(self.max_days + 1, self._ratio, k)[1:]
+        return np.array(exact) + tail
+
+    def summary_moments(self):
+        """Mean, variance, skew and excess kurtosis of the day of the first X."""
+        return watering_chain.summary_moments(self.moments(4))
 
 def fit_exponential(x,y):
     ly = np.log(y)
@@ -98,9 +160,33 @@ def create_approximate_pmf(px, days, probabilities, day_cut=40):
     max_day = days[-1]
     return ApproximatePMF(px, *params, {d:p for d,p in zip(days, probabilities)})
 
-def load():
-    probs_file = "ProbabilityMassFunctions.csv"
-    df = pd.read_csv(probs_file, index_col='Day')
+@memoize(BoundedCache("analytic_approximation._exact_pmf", maxsize=PMF_CACHE_SIZE, tags=("rules",)))
+def _exact_pmf(px, days, rules):
+    probs = watering_chain.pmf(px, days, rules)
+    slope = np.log(watering_chain.tail_ratio(px, rules))
+    intercept = np.log(probs[-1]) - slope * days
+    return ApproximatePMF(px, slope, intercept, {d: p for d, p in zip(range(1, days + 1), probs)})
+
+@metrics.timed("analytic_approximation.pmf_for")
+def pmf_for(px, days=75, rules=None):
+    """ApproximatePMF for any 0 < px <= 1: exact (watering_chain) up to days, then the chain's own geometric tail.
+
+    Results are kept in a least recently used cache of PMF_CACHE_SIZE entries keyed by (px, days, rules).
+    """
+    px = float(px)
+    if not 0.0 < px <= 1.0:
+        raise ValueError(f"px should be a probability in (0, 1]. Saw: {px}")
+    return _exact_pmf(px, days, rules or DEFAULT_RULES)
+
+def read_pmf_table(path=None) -> pd.DataFrame:
+    """ProbabilityMassFunctions.csv from path, or the copy packaged with animalcrossing.time if path is None."""
+    if path is None:
+        with importlib.resources.open_text("animalcrossing.time", "ProbabilityMassFunctions.csv") as f:
+            return pd.read_csv(f, index_col='Day')
+    return pd.read_csv(path, index_col='Day')
+
+def load(path=None):
+    df = read_pmf_table(path)
 
     pmfs = {}
     for i, col in enumerate(df):
@@ -115,8 +201,7 @@ def load():
 
 if __name__ == "__main__":
     import matplotlib.pyplot as plt
-    probs_file = "ProbabilityMassFunctions.csv"
-    df = pd.read_csv(probs_file, index_col='Day')
+    df = read_pmf_table()
     print(df)
 
     fig, axs = plt.subplots(2,sharex=True)
@@ -1,6 +1,9 @@
 """
 Collection of some analytical 
 probability calculations. 
+
+Breeding chances come from a rules.WateringRules (DEFAULT_RULES unless
+a rules argument is given).
 """
 from collections import Counter, namedtuple
 import itertools
@@ -11,6 +14,10 @@ import operator
 import math
 import time as py_time
 
+from .rules import DEFAULT_RULES
+from .. import metrics
+from ..cache import BoundedCache
+
 def p_or(p1,p2):
     for p in [p1,p2]:
         if not 0 <= p <= 1.0:
@@ -29,19 +36,15 @@ def constant_p_generator(p):
     while True:
         yield p
 
-def watered_single_generator(water_count=1):
+def watered_single_generator(water_count=1, rules=None):
+    rules = rules or DEFAULT_RULES
     while True:
-        if water_count < 4:
-            yield 0.05
-        elif water_count <= 20:
-            yield 0.1 + (water_count - 4)*0.05
-        else:
-            yield 0.90
+        yield rules.single_chance(water_count)
         water_count += 1
 
 
-def watered_pair_generator(water_count=0):
-    gen = watered_single_generator()
+def watered_pair_generator(water_count=0, rules=None):
+    gen = watered_single_generator(rules=rules)
     while True:
         p = next(gen)
         yield p_or(p,p)
@@ -51,14 +54,8 @@ def pair_progeny(p_progeny, water_count=0):
     raise ValueError("I don't think this one can be done b/c it's stateful and would branch infinetly if you enumerated it? Maybe? ")
 
 
-def prob_pair_breed(day):
-    if day < 4:
-        p = 0.05
-    elif day <= 20:
-        p = 0.1 + (day - 4) * 0.05
-    else:
-        p = 0.90
-    return p_or(p,p)
+def prob_pair_breed(day, rules=None):
+    return (rules or DEFAULT_RULES).pair_chance(day)
 
 
 regex = re.compile("F*S")
@@ -81,16 +78,15 @@ def _p_on_D(px, D):
     #return list(p_ors(sequence_probs))[-1] ### this makes less sense since its been constructed as mutually exclusive events and the simple sum "or" matches empirical/monte carlo results @ 1 million iters better
     return sum(sequence_probs)
 
-_cache = {}
-_cache_hits = 0
-_cache_misses = 0
-def _p_up_to_D(px, days):
+_cache = BoundedCache("analytic_results._sub_prod", maxsize=65536, tags=("rules",))
+def _p_up_to_D(px, days, rules=None):
+    rules = rules or DEFAULT_RULES
     D = 1
     seqs = [["S"]]
     prob_at_days = []
     while D <= days:
         #print(f"Day {D}")
-        prob_at_day = sum(_seq_prob(px, seq) for seq in seqs)
+        prob_at_day = sum(_seq_prob(px, seq, rules) for seq in seqs)
         prob_at_days.append(prob_at_day)
 
         if D >= days:
@@ -108,29 +104,30 @@ def _p_up_to_D(px, days):
         D += 1
     return prob_at_days
 
-def _seq_prob(px, seq_subs):
+def _seq_prob(px, seq_subs, rules=None):
     #sub_probs = [_sub_prod(sub) for sub in seq_subs]
     #sub_probs = [sub_prob*(1-px) for sub_prob in sub_probs[:-1]] + [sub_probs[-1]*px]
-    sub_probs = [_sub_prod(sub)*(1-px) for sub in seq_subs]
+    sub_probs = [_sub_prod(sub, rules)*(1-px) for sub in seq_subs]
     sub_probs[-1] *= px/(1-px)
     #return math.prod(sub_probs) ##not availalbe in pypy 3.7
     return list(itertools.accumulate(sub_probs, operator.mul))[-1]
 
 
-def _sub_prod(sub):
-    global _cache_hits, _cache_misses
-    if sub in _cache:
-        _cache_hits = _cache_hits + 1
-        return _cache[sub]
+def _sub_prod(sub, rules=None):
+    """Cached per rule set (in _cache, a cache.BoundedCache)."""
+    rules = rules or DEFAULT_RULES
+    key = (rules, sub)
+    sub_prob = _cache.get(key)
+    if sub_prob is not None:
+        return sub_prob
     else:
-        _cache_misses = _cache_misses + 1
         L = len(sub)
         ##sub_prob = math.prod(1 - prob_pair_breed(i + 1) for i in range(L - 1)) ##not availalbe in pypy 3.7
-        to_prod = [1 - prob_pair_breed(i + 1) for i in range(L - 1)]
+        to_prod = [1 - prob_pair_breed(i + 1, rules) for i in range(L - 1)]
         to_prod.insert(0,1)
         sub_prob = list(itertools.accumulate(to_prod, operator.mul))[-1]
-        sub_prob *= prob_pair_breed(L)
-        _cache[sub] = sub_prob
+        sub_prob *= prob_pair_breed(L, rules)
+        _cache[key] = sub_prob
         return sub_prob
 
 
@@ -154,8 +151,8 @@ def _sub_prod(sub):
 
 
 
-def time_to_pair_progeny(p_progeny, alphas, water_count=0, samples=10000):
-    sample_results = estimate_pair_progeny_distribution(p_progeny,water_count,samples)
+def time_to_pair_progeny(p_progeny, alphas, water_count=0, samples=10000, rules=None, rng=random):
+    sample_results = estimate_pair_progeny_distribution(p_progeny,water_count,samples,rules,rng)
     days = sample_results.days
     cum_count = sample_results.cum_counts
     result = []
@@ -167,8 +164,9 @@ def time_to_pair_progeny(p_progeny, alphas, water_count=0, samples=10000):
 
 SampleResults = namedtuple("SampleResults", ['days','counts','cum_counts','raw_days'])
 #@profile
-def estimate_pair_progeny_distribution(p_progeny, water_count=0, samples=10000):
-    days_to = [_pair_progeny_simulation(p_progeny, water_count) for _ in range(samples)]
+def estimate_pair_progeny_distribution(p_progeny, water_count=0, samples=10000, rules=None, rng=random):
+    """Simulate samples pairs drawing from rng (a random.Random, the random module by default)."""
+    days_to = [_pair_progeny_simulation(p_progeny, water_count, rules, rng) for _ in range(samples)]
     counter = list(Counter(days_to).items())
     counter.sort(key=lambda x: x[0])
     days = [count[0] for count in counter]
@@ -177,15 +175,15 @@ def estimate_pair_progeny_distribution(p_progeny, water_count=0, samples=10000):
     return SampleResults(days, count, cum_count, days_to)
 
 #@profile
-def _pair_progeny_simulation(p_progeny, water_count=0):
+def _pair_progeny_simulation(p_progeny, water_count=0, rules=None, rng=random):
     day = 1
-    pairing_prob = watered_pair_generator(water_count)
+    pairing_prob = watered_pair_generator(water_count, rules)
     while True:
-        if random.random() <= next(pairing_prob): ### we've bred the pair
+        if rng.random() <= next(pairing_prob): ### we've bred the pair
             #reset the watering
-            pairing_prob = watered_pair_generator(water_count)
+            pairing_prob = watered_pair_generator(water_count, rules)
             #check if correct offspring
-            if random.random() <= p_progeny:
+            if rng.random() <= p_progeny:
                 return day
         day += 1
 
@@ -200,6 +198,7 @@ def export_probabilities(px, ps, file, comments=None):
             f.write(f"{i+1},{p},{cp}\n")
 
 if __name__ == "__main__":
+    metrics.enable()
     print(time(constant_p_generator(0.0156), 0.95))
 
     s_gen = watered_single_generator(0)
@@ -221,9 +220,8 @@ if __name__ == "__main__":
     p = common_ps[5]
     for p in common_ps[0:1]:
         samples = 5000
-        random.seed(1)
         start_time = py_time.perf_counter()
-        ts, sampleResult = time_to_pair_progeny(p, alphas, samples=samples)
+        ts, sampleResult = time_to_pair_progeny(p, alphas, samples=samples, rng=random.Random(1))
         end_time = py_time.perf_counter()
         for alpha, t in zip(alphas, ts):
             print(f"Time to pair breeding progeny with p={p} at {alpha:.0%} confidence: {t}")
@@ -240,8 +238,9 @@ if __name__ == "__main__":
         end_time = py_time.perf_counter()
         print(f"Direct evaluation took {end_time-start_time} seconds")
 
-        print(f"Hits: {_cache_hits} {_cache_hits/(_cache_hits+_cache_misses):%}")
-        print(f"Misses: {_cache_misses} {_cache_misses / (_cache_hits + _cache_misses):%}")
+        stats = metrics.snapshot()['caches']["analytic_results._sub_prod"]
+        print(f"Hits: {stats['hits']} {stats['hit_rate']:%}")
+        print(f"Misses: {stats['misses']} {1 - stats['hit_rate']:%}")
         print()
 
         #export_probabilities(p,ps,f"./P_{p*100:02.0f}_Export.csv", f"Direct evaluation took {end_time-start_time} seconds")
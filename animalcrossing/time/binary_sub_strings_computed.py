@@ -1,5 +1,5 @@
 import pickle
-import binary_sub_strings
+from . import binary_sub_strings
 import time
 import multiprocessing as mp
 from collections import namedtuple
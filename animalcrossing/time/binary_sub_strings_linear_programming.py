@@ -1,23 +1,22 @@
 from collections import Counter, namedtuple
-import gc
 import math
-import functools
 import datetime
 import pickle
 
+from ..cache import BoundedCache, memoize
+
 StringComputation = namedtuple("StringComputation",['depth', 'counts','time','total','unique'])
 
 
 def count_unordered_strings_at_depth(D):
     """Count instances of strings after reordering them to a 'cononical' form where they are in sorted form shortest to longest."""
     result = _strings_at_depth(1, 1, D)
-    _strings_at_depth.cache_clear()
-    gc.collect()
+    _strings_at_depth.cache.clear()  # entries are only reused within one depth D
     return result
 
 
-#@functools.cache
-@functools.lru_cache(maxsize=256)
+## the counters grow quickly with depth, so the cache is bounded by their size too
+@memoize(BoundedCache("binary_sub_strings_linear_programming._strings_at_depth", maxsize=256, maxbytes=2 ** 30))
 def _strings_at_depth(head, current_depth, D):
     if current_depth >= D:
         unordered_string = tuple(sorted([head]))
@@ -0,0 +1,157 @@
+"""
+Exact distribution of the number of flowers after cloning
+for d days, starting from j freshly watered flowers.
+
+Each flower clones with a chance set by its own watering counter
+(rules.WateringRules: days since it last cloned, 1..20 with the cap of
+20 and on all the same; every function takes a rules argument, results
+are cached per rule set). When it clones, both it and the new
+clone restart at 1. Flowers clone independently, so the population is a
+multi-type branching process over the watering counters: if F[w][d] is
+the distribution of flowers descended from one flower with counter w
+after d days, then
+
+    F[w][d] = s(w) * (F[1][d-1] convolved with itself) + (1 - s(w)) * F[w+1][d-1]
+
+where s(w) is the cloning chance. j starters are j independent copies of
+F[1][d], i.e. its j-fold convolution. Counts are tracked exactly up to
+max_count with every larger count lumped into the last bin, which is all
+that is needed for P(at least x flowers).
+
+simulate_population is a vectorized Monte Carlo of the same model
+(binomial draws per watering count) kept for validation,
+simulate_clone_times samples the day a target count is first reached.
+
+Running as a main/script compares the exact and Monte Carlo results.
+"""
+import numpy as np
+
+from ..cache import BoundedCache, memoize
+from .rules import DEFAULT_RULES
+
+
+def clone_probs(rules=None):
+    """Probability a single flower clones at watering counts 1..rules.cap (index 0 is count 1)."""
+    return (rules or DEFAULT_RULES).single_probs()
+
+
+def _convolve(a, b):
+    """Distribution of the sum of two counts whose last bin means 'at least that many'."""
+    c = np.convolve(a, b)
+    c[len(a) - 1] = c[len(a) - 1:].sum()
+    return c[:len(a)]
+
+
+@memoize(BoundedCache("cloning._single_flower_pmf", maxsize=64, maxbytes=256 * 2 ** 20, tags=("rules",)))
+def _single_flower_pmf(max_days, max_count, rules):
+    """P[d, n]: probability one fresh flower has become n flowers after d days (n = max_count means at least).
+
+    Cached, so read only.
+    """
+    s = clone_probs(rules)[:, None]
+    F = np.zeros((s.size, max_count + 1))
+    F[:, min(1, max_count)] = 1.0
+    result = [F[0].copy()]
+    for _ in range(max_days):
+        doubled = _convolve(F[0], F[0])
+        advanced = np.vstack([F[1:], F[-1:]])
+        F = s * doubled + (1 - s) * advanced
+        result.append(F[0].copy())
+    result = np.array(result)
+    result.flags.writeable = False
+    return result
+
+
+def population_pmf(max_days, max_count, starters=1, rules=None) -> np.ndarray:
+    """P[d, n] for starters fresh flowers, days d = 0..max_days and counts n = 0..max_count (last bin: at least)."""
+    single = _single_flower_pmf(max_days, max_count, rules or DEFAULT_RULES)
+    P = single
+    for _ in range(starters - 1):
+        P = np.array([_convolve(p, s) for p, s in zip(P, single)])
+    return P
+
+
+def prob_at_least(x, max_days, starters=1, rules=None) -> np.ndarray:
+    """P(at least x flowers by day d) for d = 0..max_days, x may be an array (result shape (max_days+1, len(x)))."""
+    x = np.asarray(x)
+    P = population_pmf(max_days, int(x.max()), starters, rules)
+    tail = np.cumsum(P[:, ::-1], axis=1)[:, ::-1]  # tail[d, n] = P(count >= n)
+    return tail[:, x]
+
+
+def time_to_x(x, alpha, starters=1, max_days=64, rules=None):
+    """First day with at least x flowers with probability alpha, starting from starters flowers."""
+    if starters >= x:
+        return 0
+    return int(times_to_x([x], [alpha], starters, max_days, rules)[0, 0])
+
+
+def times_to_x(xs, alphas, starters=1, max_days=64, rules=None) -> np.ndarray:
+    """time_to_x for every alpha (rows) and x (columns) at once, doubling max_days until all are reached."""
+    xs = np.asarray(xs)
+    alphas = np.asarray(alphas, dtype=float)[:, None, None]
+    while True:
+        p = prob_at_least(xs, max_days, starters, rules)
+        reached = p[None, :, :] >= alphas
+        if reached[:, -1, :].all():
+            return np.argmax(reached, axis=1)
+        max_days *= 2
+
+
+def simulate_population(starters, max_days, samples, rng=None, rules=None) -> np.ndarray:
+    """Monte Carlo flower counts, shape (samples, max_days+1), for validating the exact results."""
+    rng = np.random.default_rng(rng)
+    s = clone_probs(rules)
+    counts = np.zeros((samples, s.size), dtype=np.int64)  # flowers by watering count - 1
+    counts[:, 0] = starters
+    totals = [counts.sum(axis=1)]
+    for _ in range(max_days):
+        clones = rng.binomial(counts, s)
+        waiting = counts - clones
+        counts = np.zeros_like(counts)
+        counts[:, 0] = 2 * clones.sum(axis=1)
+        counts[:, 1:] = waiting[:, :-1]
+        counts[:, -1] += waiting[:, -1]
+        totals.append(counts.sum(axis=1))
+    return np.array(totals).T
+
+
+def simulate_clone_times(x, samples, starters=1, rng=None, rules=None) -> np.ndarray:
+    """Monte Carlo day on which starters fresh flowers first became at least x flowers, one per sample."""
+    rng = np.random.default_rng(rng)
+    s = clone_probs(rules)
+    days = np.zeros(samples, dtype=np.int64)
+    waiting = np.arange(samples) if starters < x else np.arange(0)
+    counts = np.zeros((waiting.size, s.size), dtype=np.int64)
+    counts[:, 0] = starters
+    day = 0
+    while waiting.size:
+        day += 1
+        clones = rng.binomial(counts, s)
+        held = counts - clones
+        counts = np.zeros_like(counts)
+        counts[:, 0] = 2 * clones.sum(axis=1)
+        counts[:, 1:] = held[:, :-1]
+        counts[:, -1] += held[:, -1]
+        done = counts.sum(axis=1) >= x
+        days[waiting[done]] = day
+        waiting = waiting[~done]
+        counts = counts[~done]
+    return days
+
+
+if __name__ == "__main__":
+    import time
+
+    start_time = time.perf_counter()
+    exact = {j: prob_at_least(np.arange(1, 33), 50, j) for j in range(1, 9)}
+    print(f"Exact P(at least x | d, j) for x<=32, d<=50, j<=8 took {time.perf_counter() - start_time:.3f} seconds")
+
+    start_time = time.perf_counter()
+    sims = simulate_population(1, 50, 10000, rng=0)
+    print(f"Monte Carlo, 10000 samples of 1 starter took {time.perf_counter() - start_time:.3f} seconds")
+    mc = (sims[:, :, None] >= np.arange(1, 33)).mean(axis=0)
+    print(f"Max difference exact - Monte Carlo: {np.abs(exact[1] - mc).max():.4f}")
+
+    for x in [2, 8, 16, 32]:
+        print(f"Days to {x} flowers from 1: {time_to_x(x, 0.5)}-{time_to_x(x, 0.95)} (alpha=0.5,0.95)")
@@ -1,6 +1,24 @@
+"""
+Lookups in the precomputed breeding time tables (see precompute).
+
+The tables are read once, on first use, and compiled into dense numpy
+grids indexed by (px, alpha) and (px, alpha, number of pairs). px and
+alpha values between grid points are linearly interpolated in
+(log px, alpha), which keeps the times monotone in both; values outside
+the grid raise a ValueError. Every lookup accepts numpy arrays and
+returns an array of the same shape (a float for scalar arguments).
+Times not reached within the tables' horizon are stored as inf; a
+lookup which interpolates from any such cell returns np.inf, and
+TimeGrid.capped tells which lookups those are.
+
+Running as a main/script prints some example lookups.
+"""
 import importlib.resources
+import numpy as np
 import pandas as pd
 
+from .. import metrics
+
 is_initialized = False
 
 alpha = 0.0
@@ -10,51 +28,135 @@ pair_breeding_table = None
 self_breeding_table = None
 n_pair_table = None
 
-
-
+_PX = 'Prob(X)'
+_ALPHA = 'Confidence Level (alpha)'
+_N = 'Number of Pairs'
+
+_grids = {}
+
+## never reached cells are interpolated as _NEVER: any lookup with a positive weight on one ends up above
+## _NEVER_SEEN (weights are far above 1e-100) and no sum of four weighted cells can overflow
+_NEVER = 1e300
+_NEVER_SEEN = 1e200
+
+
+class TimeGrid:
+    """Times on a (px, alpha[, n]) grid, px and alpha ascending, n = 1..len, np.inf where never reached."""
+
+    def __init__(self, table, extra=None):
+        self.pxs = np.sort(table[_PX].unique())
+        self.log_pxs = np.log(self.pxs)
+        self.alphas = np.sort(table[_ALPHA].unique())
+        shape = (len(self.log_pxs), len(self.alphas))
+        i = np.searchsorted(self.log_pxs, np.log(table[_PX].values))
+        j = np.searchsorted(self.alphas, table[_ALPHA].values)
+        index = (i, j)
+        if extra is not None:
+            n = table[extra].values
+            self.ns = np.arange(1, n.max() + 1)
+            shape += (len(self.ns),)
+            index += (n - 1,)
+        self.values = np.full(shape, np.nan)
+        self.values[index] = [_to_days(t) for t in table['Time'].values]
+        self.never = np.isinf(self.values)
+        self._grid = np.where(self.never, _NEVER, self.values)
+
+    def __call__(self, px, a, n=None):
+        """Interpolated days, np.inf where any cell interpolated from was never reached."""
+        result = self._interpolate(px, a, n)
+        result[result >= _NEVER_SEEN] = np.inf
+        return float(result) if result.ndim == 0 else result
+
+    def capped(self, px, a, n=None):
+        """True where a lookup interpolates from a cell never reached within the tables' horizon."""
+        result = self._interpolate(px, a, n) >= _NEVER_SEEN
+        return bool(result) if result.ndim == 0 else result
+
+    def _interpolate(self, px, a, n):
+        """Bilinear interpolation of the grid with never reached cells as _NEVER, as an array."""
+        corners, weights = self._corners(px, a, n)
+        g = self._grid
+        return np.asarray(sum(w * g[c] for c, w in zip(corners, weights)), dtype=float)
+
+    def _corners(self, px, a, n):
+        """Grid indices of the four cells interpolated from and their weights."""
+        px, a = np.broadcast_arrays(np.asarray(px, dtype=float), np.asarray(a, dtype=float))
+        i, tp = _locate(self.log_pxs, np.log(px), px, "Prob(X={})", self.pxs)
+        j, ta = _locate(self.alphas, a, a, "Confidence level alpha={}", self.alphas)
+        index = ()
+        if n is not None:
+            n = np.asarray(n)
+            if np.any((n < 1) | (n > len(self.ns)) | (n != np.round(n))):
+                raise ValueError(f"Number of pairs n={n} not available in precomputed tables.\n\tTry:1..{len(self.ns)}")
+            index = (n.astype(int) - 1,)
+        corners = [(i, j) + index, (i + 1, j) + index, (i, j + 1) + index, (i + 1, j + 1) + index]
+        weights = [(1 - tp) * (1 - ta), tp * (1 - ta), (1 - tp) * ta, tp * ta]
+        return corners, weights
+
+
+def _to_days(t):
+    """Days of a table entry, tables written before never reached times were inf have ">N" for them."""
+    if isinstance(t, str) and t.startswith(">"):
+        return np.inf
+    return float(t)
+
+
+def _locate(grid, x, value, name, available):
+    """Cell index and fractional position of x (from value) in the ascending grid, ValueError outside it."""
+    outside = ~((x >= grid[0]) & (x <= grid[-1]))
+    if np.any(outside):
+        raise ValueError(f"{name.format(value[outside])} outside the precomputed tables loaded.\n\tTry:{available.tolist()}")
+    if len(grid) == 1:
+        return np.zeros(x.shape, dtype=int), np.zeros(x.shape)
+    i = np.clip(np.searchsorted(grid, x, side='right') - 1, 0, len(grid) - 2)
+    t = (x - grid[i]) / (grid[i + 1] - grid[i])
+    return i, t
+
+
+@metrics.timed("expected_breeding_time.init")
 def init(force=False):
     """Load precomputed tables, set current alpha level to 0.5 if exists, else largest in tables."""
-    global pair_breeding_table, self_breeding_table, alphas, alpha, pxs, n_pair_table
+    global pair_breeding_table, self_breeding_table, alphas, alpha, pxs, n_pair_table, is_initialized, _grids
+    if is_initialized and not force:
+        return
     with importlib.resources.open_text("animalcrossing.time","CloningPairsThenBreedingTimes.csv") as f:
         pair_breeding_table = pd.read_csv(f)
     with importlib.resources.open_text("animalcrossing.time","CloningThenBreedingSelfTimes.csv") as f:
         self_breeding_table = pd.read_csv(f)
-    alphas = set(pair_breeding_table['Confidence Level (alpha)'].values)
+    alphas = set(pair_breeding_table[_ALPHA].values)
     alpha = 0.5 if 0.5 in alphas else max(alphas)
-    pxs = set(pair_breeding_table['Prob(X)'].values)
+    pxs = set(pair_breeding_table[_PX].values)
 
     with importlib.resources.open_text("animalcrossing.time","PairBreedingTable.csv") as f:
         n_pair_table = pd.read_csv(f)
 
+    _grids = {
+        'pair': TimeGrid(pair_breeding_table),
+        'self': TimeGrid(self_breeding_table),
+        'n_pairs': TimeGrid(n_pair_table, _N),
+    }
+    is_initialized = True
 
+
+@metrics.timed("expected_breeding_time.time_to")
 def time_to(px, a=None, with_itself=False):
+    """Days to clone then breed a child with probability px at confidence a (default: module alpha), np.inf if
+    not reached within the tables' horizon."""
     if not is_initialized:
         init()
-    if px not in pxs:
-        raise ValueError(f"Prob(X={px}) not available in precomputed tables loaded.\n\tTry:{pxs}")
     if a is None:
         a = alpha
-    if a not in alphas:
-        raise ValueError(f"Confidence level alpha={a} not available in precomputed tables.\n\tTry:{alphas}")
-    table = pair_breeding_table if not with_itself else self_breeding_table
-    table = table[table['Confidence Level (alpha)']==a]
-    return float(table[table['Prob(X)'] == px]['Time'].values[0])
+    return _grids['self' if with_itself else 'pair'](px, a)
 
+@metrics.timed("expected_breeding_time.time_n_pairs")
 def time_n_pairs(px, n, a=None):
+    """Days for n pairs to breed a child with probability px at confidence a (default: module alpha), np.inf if
+    not reached within the tables' horizon."""
     if not is_initialized:
         init()
-    if px not in pxs:
-        raise ValueError(f"Prob(X={px}) not available in precomputed tables loaded.\n\tTry:{pxs}")
     if a is None:
         a = alpha
-    if a not in alphas:
-        raise ValueError(f"Confidence level alpha={a} not available in precomputed tables.\n\tTry:{alphas}")
-
-    table = n_pair_table
-    table = table[table['Confidence Level (alpha)']==a]
-    table = table[table['Prob(X)'] == px]
-    table = table[table['Number of Pairs']==n]
-    return float(table['Time'].values[0])
+    return _grids['n_pairs'](px, a, n)
 
 
 if __name__ == "__main__":
@@ -76,13 +178,16 @@ if __name__ == "__main__":
     print(f"Module alpha is {alpha}, calculating P(x=0.125|alpha=0.5)={time_to(0.125,0.5)}")
     print()
 
-    print("Trying to call time_to(0.43) which is not a computed probability will raise the following Exception")
+    print(f"Interpolated time to produce child with P(x) = 0.43 is {time_to(0.43)} (alpha={alpha})")
+    print(f"Batched times with 8 pairs: {time_n_pairs(np.array([0.5, 0.43, 0.25, 0.01]), 8)}")
+    print()
+    print("Trying to call time_to(0.001) which is below the computed probabilities will raise the following Exception")
     try:
-        time_to(0.43)
+        time_to(0.001)
     except Exception as e:
         print(e)
 
-    print("Trying to call time_to(0.25,0.99) which is not a computed confidence level will raise the following Exception")
+    print("Trying to call time_to(0.25,0.99) which is outside the computed confidence levels will raise the following Exception")
     try:
         time_to(0.25,0.99)
     except Exception as e:
@@ -1,27 +1,55 @@
-import analytic_results
-import itertools
-import matplotlib.pyplot as plt
+"""
+Mean, variance, skew and kurtosis of the number of days until a
+flower X is first bred.
+
+The moments are exact, computed from the watering Markov chain
+(watering_chain.raw_moments for one pair, min_raw_moments for the first
+of several pairs) for many px and numbers of pairs at once, instead of
+estimating them from large samples.
+
+Running as a main/script compares them with Monte Carlo estimates
+accumulated batch by batch in monte_carlo.OnlineMoments.
+"""
+import numpy as np
 import pandas as pd
-import scipy.stats
 
+from . import monte_carlo
+from . import watering_chain
 
+COLUMNS = ["Mean", "Variance", "Skew", "Kurtosis"]
 
-fig, axs = plt.subplots(4,sharex=True)
 
-for px in [0.5,0.25,0.125,0.125/2, 0.125/4,0.125/8]:
-    results = analytic_results.estimate_pair_progeny_distribution(px,samples=100000)
-    raw_days = results.raw_days
+def moment_table(pxs, num_pairs=(1,), rules=None) -> pd.DataFrame:
+    """One row per (px, number of pairs): exact mean, variance, skew and excess kurtosis of the days to X."""
+    raw = watering_chain.min_raw_moments(pxs, num_pairs, rules=rules)
+    summary = watering_chain.summary_moments(raw)
+    index = pd.MultiIndex.from_product([list(pxs), list(num_pairs)], names=["Prob(X)", "Pairs"])
+    return pd.DataFrame(summary.reshape(-1, 4), index=index, columns=COLUMNS)
 
-    s = pd.Series(raw_days)
 
-    means = s.expanding(1).mean()
-    vars = s.expanding(2).var()
-    skews = s.expanding(3).skew()
-    kurts = s.expanding(4).kurt()
+def simulated_moments(px, num_pairs=1, samples=1000000, batch_size=100000, rng=None, rules=None):
+    """OnlineMoments of samples simulated days to X from num_pairs pairs."""
+    rng = np.random.default_rng(rng)
+    moments = monte_carlo.OnlineMoments()
+    for start in range(0, samples, batch_size):
+        n = min(batch_size, samples - start)
+        days = monte_carlo.simulate_pair_progeny(px, n * num_pairs, rng, rules=rules)
+        moments.add(days.reshape(n, num_pairs).min(axis=1))
+    return moments
 
 
-    axs[0].plot(means, label=f"{px}")
-    axs[1].plot(vars)
-    axs[2].plot(skews)
-    axs[3].plot(kurts)
-axs[0].legend()
\ No newline at end of file
+if __name__ == "__main__":
+    import time
+
+    pxs = [0.5, 0.25, 0.125, 0.125 / 2, 0.125 / 4, 0.125 / 8]
+    num_pairs = [1, 4, 16]
+    start_time = time.perf_counter()
+    exact = moment_table(pxs, num_pairs)
+    print(f"Exact moments for {len(pxs)} px and {len(num_pairs)} numbers of pairs took "
+          f"{time.perf_counter() - start_time:.3f} seconds")
+
+    start_time = time.perf_counter()
+    simulated = pd.DataFrame([simulated_moments(px, n, samples=100000, rng=1).summary() for px, n in exact.index],
+                             index=exact.index, columns=COLUMNS)
+    print(f"Monte Carlo, 100000 samples each, took {time.perf_counter() - start_time:.1f} seconds")
+    print(exact.join(simulated, rsuffix=" (MC)").to_string(float_format="{:.3f}".format))
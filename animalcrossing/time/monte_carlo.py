@@ -0,0 +1,151 @@
+"""
+Vectorized Monte Carlo estimates of the number of days a pair
+of parents needs to produce a flower X.
+
+Same model as analytic_results._pair_progeny_simulation, but every
+sample is an element of numpy arrays (watering counter and which samples
+are still waiting) which are all advanced one day at a time, so millions
+of pairs are simulated in lockstep. Randomness comes from a numpy
+Generator: pass a seed, SeedSequence or Generator as rng for
+reproducible, independent streams.
+
+OnlineMoments accumulates mean, variance, skew and kurtosis of samples
+batch by batch in constant memory, to cross-check the exact moments
+of watering_chain.raw_moments against simulations of any size.
+
+Running as a main/script compares the run time against
+analytic_results.estimate_pair_progeny_distribution.
+"""
+import bisect
+
+import numpy as np
+
+from . import analytic_results
+from . import watering_chain
+
+
+def simulate_pair_progeny(p_progeny, samples, rng=None, batch_size=1000000, rules=None) -> np.ndarray:
+    """Array of the day each of samples independent pairs first produced X (probability p_progeny per child)."""
+    rng = np.random.default_rng(rng)
+    q = watering_chain.pair_breed_probs(rules)
+    days = np.empty(samples, dtype=np.int64)
+    for start in range(0, samples, batch_size):
+        waiting = np.arange(start, min(start + batch_size, samples))
+        counter = np.zeros(waiting.size, dtype=np.intp)  # watering count - 1
+        day = 0
+        while waiting.size:
+            day += 1
+            bred = rng.random(waiting.size) <= q[counter]
+            success = bred.copy()
+            success[bred] = rng.random(np.count_nonzero(bred)) <= p_progeny
+            days[waiting[success]] = day
+            counter = np.where(bred, 0, np.minimum(counter + 1, q.size - 1))
+            waiting = waiting[~success]
+            counter = counter[~success]
+    return days
+
+
+class OnlineMoments:
+    """Running count, mean and central moment sums M2..M4 of the samples added so far.
+
+    Batches are combined with the pairwise update of Chan et al. / Pebay, which is exact and stable.
+    Variance, skew and kurtosis are the population (biased) ones, kurtosis is the excess kurtosis.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m = np.zeros(3)  # M2, M3, M4
+
+    def __repr__(self):
+        return f"<OnlineMoments {self.count} samples: mean {self.mean:.4g}, variance {self.variance:.4g}>"
+
+    def add(self, samples):
+        """Add a number or an array of samples."""
+        x = np.asarray(samples, dtype=float).ravel()
+        if x.size:
+            mean = x.mean()
+            dx = x - mean
+            self._combine(x.size, mean, np.array([dx @ dx, dx ** 2 @ dx, dx ** 2 @ dx ** 2]))
+        return self
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other._m)
+        return self
+
+    def _combine(self, nb, mean_b, mb):
+        if nb == 0:
+            return
+        na, ma = self.count, self._m
+        n = na + nb
+        delta = mean_b - self.mean
+        m2 = ma[0] + mb[0] + delta ** 2 * na * nb / n
+        m3 = (ma[1] + mb[1] + delta ** 3 * na * nb * (na - nb) / n ** 2
+              + 3 * delta * (na * mb[0] - nb * ma[0]) / n)
+        m4 = (ma[2] + mb[2] + delta ** 4 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+              + 6 * delta ** 2 * (na * na * mb[0] + nb * nb * ma[0]) / n ** 2
+              + 4 * delta * (na * mb[1] - nb * ma[1]) / n)
+        self.count = n
+        self.mean = self.mean + delta * nb / n
+        self._m = np.array([m2, m3, m4])
+
+    @property
+    def variance(self):
+        return self._m[0] / self.count if self.count else np.nan
+
+    @property
+    def skew(self):
+        return np.sqrt(self.count) * self._m[1] / self._m[0] ** 1.5 if self._m[0] else np.nan
+
+    @property
+    def kurtosis(self):
+        return self.count * self._m[2] / self._m[0] ** 2 - 3 if self._m[0] else np.nan
+
+    def summary(self) -> np.ndarray:
+        """Mean, variance, skew and excess kurtosis, as watering_chain.summary_moments."""
+        return np.array([self.mean, self.variance, self.skew, self.kurtosis])
+
+
+def estimate_pair_progeny_distribution(p_progeny, water_count=0, samples=10000, rng=None, rules=None):
+    """Vectorized analytic_results.estimate_pair_progeny_distribution, returns the same SampleResults.
+
+    water_count is accepted for compatibility, like the original every pair starts freshly watered.
+    """
+    raw_days = simulate_pair_progeny(p_progeny, samples, rng, rules=rules)
+    days, counts = np.unique(raw_days, return_counts=True)
+    cum_counts = np.cumsum(counts)
+    return analytic_results.SampleResults(days.tolist(), counts.tolist(), cum_counts.tolist(), raw_days)
+
+
+def time_to_pair_progeny(p_progeny, alphas, water_count=0, samples=10000, rng=None, rules=None):
+    sample_results = estimate_pair_progeny_distribution(p_progeny, water_count, samples, rng, rules)
+    days = sample_results.days
+    cum_count = sample_results.cum_counts
+    result = []
+    for alpha in alphas:
+        idx = bisect.bisect_left(cum_count, alpha*cum_count[-1])
+        result.append(days[idx])
+    return result, sample_results
+
+
+if __name__ == "__main__":
+    import time
+    import random
+
+    px = 1/256
+    samples = 100000
+
+    start_time = time.perf_counter()
+    analytic_results.estimate_pair_progeny_distribution(px, samples=samples//10, rng=random.Random(1))
+    end_time = time.perf_counter()
+    print(f"analytic_results: {samples//10} samples at px={px} took {end_time - start_time:.2f} seconds")
+
+    start_time = time.perf_counter()
+    ts, results = time_to_pair_progeny(px, [0.5, 0.95], samples=samples, rng=1)
+    end_time = time.perf_counter()
+    print(f"Vectorized: {samples} samples at px={px} took {end_time - start_time:.2f} seconds")
+
+    exact_cdf = watering_chain.cdf(px, max(results.days))
+    for alpha, t in zip([0.5, 0.95], ts):
+        exact = int(np.searchsorted(exact_cdf, alpha)) + 1
+        print(f"Time at {alpha:.0%} confidence: {t} (exact {exact})")
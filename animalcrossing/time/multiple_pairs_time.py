@@ -1,65 +1,49 @@
+"""
+Times to clone a flower and then breed the clones in multiple pairs,
+and the tables derived from them.
+
+Importing this module does no work; the build_* functions compute the
+tables (see precompute for the pipeline which writes them to the csv
+files loaded by expected_breeding_time). Running as a main/script
+builds every table from the packaged ProbabilityMassFunctions.csv and
+prints the fastest strategies.
+"""
 import itertools
 import random
-import analytic_results
-import analytic_approximation
+from . import analytic_results
+from . import analytic_approximation
+from . import cloning
 from collections import Counter, namedtuple
 import warnings
-import matplotlib.pyplot as plt
-
-pmfs = analytic_approximation.load()
+import numpy as np
+import pandas as pd
 
 #P(x)=1.0,P(x)=0.5,P(x)=0.25,P(x)=0.125,P(x)=0.0625,P(x)=0.03125,P(x)=0.015625,P(x)=0.0078125,P(x)=0.00390625
-pxs = pmfs.keys()
 
-def simulate_cloning(starters=1, max_days=10):
-    """Model individual flowers using generator object which returns next days prob each day its called."""
-    flowers = [analytic_results.watered_single_generator() for _ in range(starters)]
+def simulate_cloning(starters=1, max_days=10, rules=None, rng=random):
+    """Model individual flowers using generator object which returns next days prob each day its called.
+
+    Draws from rng (a random.Random, the random module by default).
+    """
+    flowers = [analytic_results.watered_single_generator(rules=rules) for _ in range(starters)]
     count = []
     for day in range(max_days):
         count.append( len(flowers) )
         next_state = []
         for flower in flowers:
             pclone = next(flower)
-            if random.random() <= pclone:
-                next_state.append(analytic_results.watered_single_generator())
-                next_state.append(analytic_results.watered_single_generator())
+            if rng.random() <= pclone:
+                next_state.append(analytic_results.watered_single_generator(rules=rules))
+                next_state.append(analytic_results.watered_single_generator(rules=rules))
             else:
                 next_state.append(flower)
         flowers = next_state
     count.append(len(flowers))
     return count
 
-max_days = 50
-samples = 10000
-
-
-p_x_on_d_jstarters = {} #probability of x clones on day d starting with j starters, indexed p_x_on_d_jstarters[j][d][x]
-for j in range(1,9):
-    clone_sims = [simulate_cloning(j, max_days=max_days) for _ in range(samples)]
-    transpose = list(map(list, zip(*clone_sims)))
-    p_x_on_d = {} ##first index is day, second is x
-    for day in range(max_days+1):
-        counter = Counter(transpose[day])
-        probs = {num:cnt/samples for num,cnt in counter.items()}
-        assert abs(sum(probs.values()) - 1.0) < 1e-3
-        p_x_on_d[day] = probs
-    p_x_on_d_jstarters[j] = p_x_on_d
-
-def time_to_x(x, alpha, starters=1):
-    if starters >= x:
-        return 0
-    p_x_on_d = p_x_on_d_jstarters[starters]
-    for day in p_x_on_d.keys():
-        sum = 0
-        for flower_count in p_x_on_d[day].keys():
-            if flower_count >= x:
-                sum += p_x_on_d[day][flower_count]
-        if sum >= alpha:
-            return day
-    warnings.warn(f"Insuficient simulation data to evaluate time to {x} clones at confidence {alpha}")
-    return f">{day}"
-    #raise ValueError(f"Insuficient simulation data to evaluate time to {x} clones at confidence {alpha}")
-
+def time_to_x(x, alpha, starters=1, rules=None):
+    """Days to clone starters flowers into at least x flowers with confidence alpha (exact, see cloning module)."""
+    return cloning.time_to_x(x, alpha, starters, rules=rules)
 
 
 #for i in range(20):
@@ -73,17 +57,34 @@ def time_to_x(x, alpha, starters=1):
 #quit()
 
 def time_to_success(pmf, num_pairs, alpha):
+    """First day any of num_pairs independent pairs has bred X with probability alpha, inf if after 1000 days."""
     to_days = 1000
-    days, ps = pmf.pmf(to_days)
-    _, cs = pmf.cdf(to_days)
-    x_ors = [1. - (1. - ci) ** num_pairs for ci in cs]
-    for day, prob in zip(days, x_ors):
-        if prob >= alpha:
-            return day
-    warnings.warn(f"For px={pmf.px}, num_pairs={num_pairs}, alpha={alpha} probability capped at Prob({day})={prob}")
-    return f">{day}"
+    ## 1-(1-cdf)^num_pairs >= alpha  <=>  cdf >= 1-(1-alpha)^(1/num_pairs)
+    q = 1. - (1. - alpha) ** (1. / num_pairs) if num_pairs > 0 else float('inf')
+    day = pmf.quantile(q) if q <= pmf.cum_p(to_days) else to_days + 1
+    if day <= to_days:
+        return day
+    prob = 1. - (1. - pmf.cum_p(to_days)) ** num_pairs
+    warnings.warn(f"For px={pmf.px}, num_pairs={num_pairs}, alpha={alpha} probability capped at Prob({to_days})={prob}")
+    return float('inf')
     #raise ValueError(f"For px={pmf.px}, num_pairs={num_pairs}, alpha={alpha} probability capped at Prob({day})={prob}")
 
+def pair_breeding_times(pmfs, num_pairs, alphas, to_days=1000) -> np.ndarray:
+    """time_to_success for every px in pmfs (dict px -> ApproximatePMF), alpha and number of pairs at once.
+
+    Returns T[px, alpha, n] (in the orders given), np.inf where the probability stays below alpha for to_days.
+    """
+    n = np.asarray(num_pairs, dtype=float)
+    alphas = np.asarray(alphas, dtype=float)
+    C = np.array([pmf.cdf(to_days)[1] for pmf in pmfs.values()])
+    ## P[px, n, d] = 1-(1-C[px, d])^n, non-decreasing in d, so each (px, n) row is offset by 2*row to search all at once
+    P = 1. - (1. - C[:, None, :]) ** n[None, :, None]
+    offsets = 2. * np.arange(P.shape[0] * P.shape[1]).reshape(P.shape[:2])
+    flat = (P + offsets[:, :, None]).ravel()
+    idx = np.searchsorted(flat, (alphas[None, :, None] + offsets[:, None, :]).ravel()).reshape(len(C), len(alphas), len(n))
+    day = idx - (to_days * np.arange(P.shape[0] * P.shape[1])).reshape(P.shape[:2])[:, None, :] + 1
+    return np.where(day <= to_days, day, np.inf)
+
 # pmf = pmfs[0.25]
 #pmf = pmfs[0.015625]
 #pmf = pmfs[0.0625]
@@ -147,100 +148,81 @@ when is time(x pairs) > time(y pairs) + time(clone x to y)
 
 ##Build some tables
 ##
-import pandas as pd
-header = ["Number of Starters", "Target Clone Count", "Confidence Level (alpha)", "Time"]
-rows = []
-for num_starters in [1,2,3,4,5,6,7,8]:
-    for alpha in [0.25,0.5,0.75,0.95]:
-        for target_num in range(1,33):
-            t = time_to_x(target_num, alpha, num_starters)
-            row = (num_starters, target_num, alpha, t)
-            rows.append(row)
-cloning_table = pd.DataFrame(rows,columns=header)
-
-
-header = ["Prob(X)", "Number of Pairs", "Confidence Level (alpha)", "Time"]
-rows = []
-for px in pxs:
-    pmf = pmfs[px]
-    for alpha in [0.25,0.5,0.75,0.95]:
-        for num_pairs in range(1,33):
-            t = time_to_success(pmf, num_pairs, alpha)
-            row = (px, num_pairs, alpha, t)
-            rows.append(row)
-pair_breeding_table = pd.DataFrame(rows,columns=header)
+CloningTime = namedtuple("CloningTime", ['num_pairs','t_clone','t_child','t_total'])
 
+def build_cloning_table(rules=None, starters=range(1,9), alphas=(0.25,0.5,0.75,0.95), targets=range(1,33)):
+    header = ["Number of Starters", "Target Clone Count", "Confidence Level (alpha)", "Time"]
+    frames = []
+    for num_starters in starters:
+        times = cloning.times_to_x(targets, alphas, num_starters, rules=rules)
+        alpha, target = np.meshgrid(alphas, targets, indexing='ij')
+        frames.append(pd.DataFrame({header[0]: num_starters, header[1]: target.ravel(), header[2]: alpha.ravel(),
+                                    header[3]: times.ravel()}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _times_column(times, to_days=1000):
+    """Days as ints, inf where not reached within to_days (written as "inf"), warning once if any are."""
+    capped = np.isinf(times)
+    if capped.any():
+        warnings.warn(f"{capped.sum()} times not reached within {to_days} days")
+    return np.array([float('inf') if c else int(t) for t, c in zip(times, capped)], dtype=object)
 
-CloningTime = namedtuple("CloningTime", ['num_pairs','t_clone','t_child','t_total'])
 
-num_starters = 1
-alphas = [0.5,0.95]
-header = ['Prob(X)', "Confidence Level (alpha)", "Time", "Number of Pairs"]
-rows = []
-for px in pxs:
-    pmf = pmfs[px]
-    fastest_at_confidence = {}
-    for alpha in alphas:
-        cloning_times = []
-        for num_pairs in range(1,51):
-            tclone = time_to_x(num_pairs, alpha, num_starters)
-            tchild = time_to_success(pmf, num_pairs, alpha)
-            if type(tclone) == str:
-                tclone = int(tclone[1:])
-            if type(tchild) == str:
-                tchild = int(tchild[1:])
-            cloning_times.append(CloningTime(num_pairs,tclone,tchild,tclone+tchild))
-        fastest = min(ct.t_total for ct in cloning_times)
-        cloning_times = [ct for ct in cloning_times if ct.t_total == fastest]
-        fastest_at_confidence[alpha] = cloning_times
-    print(px)
-    for alpha, strats in fastest_at_confidence.items():
-        if alpha == 0.5:
-            strat = strats[-1]
-            print(f"{alpha}, {strat}")
-        if alpha == 0.95:
-            strat = strats[0]
-            print(f"{alpha}, {strat}")
-        row = (px,alpha,strat.t_total,strat.num_pairs)
-        rows.append(row)
-    print()
-fastest_pair_strategy_table = pd.DataFrame(rows,columns=header)
-
-num_starters = 1
-alphas = [0.5,0.95]
-header = ['Prob(X)', "Confidence Level (alpha)", "Time", "Number of Flowers"]
-rows = []
-for px in pxs:
-    pmf = pmfs[px]
-    fastest_at_confidence = {}
-    for alpha in alphas:
-        cloning_times = []
-        for num_flowers in range(1,51):
-            tclone = time_to_x(num_flowers, alpha, num_starters)
-            tchild = time_to_success(pmf, int(num_flowers/2), alpha)
-            if type(tclone) == str:
-                tclone = int(tclone[1:])
-            if type(tchild) == str:
-                tchild = int(tchild[1:])
-            cloning_times.append(CloningTime(num_flowers,tclone,tchild,tclone+tchild))
-        fastest = min(ct.t_total for ct in cloning_times)
-        cloning_times = [ct for ct in cloning_times if ct.t_total == fastest]
-        fastest_at_confidence[alpha] = cloning_times
-
-    for alpha, strats in fastest_at_confidence.items():
-        if alpha == 0.5:
-            strat = strats[-1]
-            print(f"{alpha}, {strat}")
-        if alpha == 0.95:
-            strat = strats[0]
-            print(f"{alpha}, {strat}")
-        row = (px,alpha,strat.t_total,strat.num_pairs)
-        rows.append(row)
-    print()
-fastest_single_self_breed_strategy_table = pd.DataFrame(rows,columns=header)
-
-
-cloning_table.to_csv("CloningTable.csv",index=False)
-pair_breeding_table.to_csv("PairBreedingTable.csv", index=False)
-fastest_pair_strategy_table.to_csv("CloningPairsThenBreedingTimes.csv", index=False)
-fastest_single_self_breed_strategy_table.to_csv("CloningThenBreedingSelfTimes.csv", index=False)
+def build_pair_breeding_table(pmfs, num_pairs=range(1,33), alphas=(0.25,0.5,0.75,0.95)):
+    header = ["Prob(X)", "Number of Pairs", "Confidence Level (alpha)", "Time"]
+    times = pair_breeding_times(pmfs, num_pairs, alphas)
+    px, alpha, n = np.meshgrid(list(pmfs.keys()), alphas, num_pairs, indexing='ij')
+    return pd.DataFrame({header[0]: px.ravel(), header[1]: n.ravel(), header[2]: alpha.ravel(),
+                         header[3]: _times_column(times.ravel())})
+
+
+def _fastest_strategies(pmfs, flowers_to_pairs, count_name, verbose=False, rules=None):
+    """Fastest 'clone to N flowers then breed flowers_to_pairs(N) pairs' strategy for N in 1..50 at alpha 0.5 and 0.95."""
+    num_starters = 1
+    to_days = 1000
+    alphas = [0.5,0.95]
+    header = ['Prob(X)', "Confidence Level (alpha)", "Time", count_name]
+    num_flowers = np.arange(1,51)
+    t_clone = cloning.times_to_x(num_flowers, alphas, num_starters, rules=rules)
+    t_child = pair_breeding_times(pmfs, [flowers_to_pairs(n) for n in num_flowers], alphas, to_days)
+    t_child = np.where(np.isinf(t_child), to_days, t_child).astype(int)
+    rows = []
+    for i, px in enumerate(pmfs.keys()):
+        if verbose:
+            print(px)
+        for j, alpha in enumerate(alphas):
+            total = t_clone[j] + t_child[i, j]
+            fastest = np.flatnonzero(total == total.min())
+            ## ties: the most flowers at 50%, the fewest at 95%
+            k = fastest[-1] if alpha == 0.5 else fastest[0]
+            strat = CloningTime(int(num_flowers[k]), int(t_clone[j, k]), int(t_child[i, j, k]), int(total[k]))
+            if verbose:
+                print(f"{alpha}, {strat}")
+            rows.append((px,alpha,strat.t_total,strat.num_pairs))
+        if verbose:
+            print()
+    return pd.DataFrame(rows,columns=header)
+
+
+def build_fastest_pair_strategy_table(pmfs, verbose=False, rules=None):
+    """Each clone is paired with a (freely available) partner. pmfs should be computed for the same rules."""
+    return _fastest_strategies(pmfs, lambda n: n, "Number of Pairs", verbose, rules)
+
+
+def build_fastest_self_breed_strategy_table(pmfs, verbose=False, rules=None):
+    """Clones are paired with each other. pmfs should be computed for the same rules."""
+    return _fastest_strategies(pmfs, lambda n: int(n/2), "Number of Flowers", verbose, rules)
+
+
+if __name__ == "__main__":
+    pmfs = analytic_approximation.load()
+    cloning_table = build_cloning_table()
+    pair_breeding_table = build_pair_breeding_table(pmfs)
+    fastest_pair_strategy_table = build_fastest_pair_strategy_table(pmfs, verbose=True)
+    fastest_single_self_breed_strategy_table = build_fastest_self_breed_strategy_table(pmfs, verbose=True)
+
+    cloning_table.to_csv("CloningTable.csv",index=False)
+    pair_breeding_table.to_csv("PairBreedingTable.csv", index=False)
+    fastest_pair_strategy_table.to_csv("CloningPairsThenBreedingTimes.csv", index=False)
+    fastest_single_self_breed_strategy_table.to_csv("CloningThenBreedingSelfTimes.csv", index=False)
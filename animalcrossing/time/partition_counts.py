@@ -0,0 +1,140 @@
+"""
+Counts of the breeding-day strings of binary_sub_strings without
+enumerating them.
+
+A string at depth D (D days, the last one a success) splits into
+sub-strings "F..FS" whose lengths are a composition of D (an ordered
+list of positive integers summing to D); there are 2^(D-1) of them.
+binary_sub_strings*.count_unordered_strings_at_depth count them by their
+sorted lengths, i.e. by the partition of D they reorder to. A partition
+with M parts where length L appears m_L times is reached by exactly
+M!/prod(m_L!) compositions, so each count is computed directly while the
+partitions are generated in order: the cost is proportional to the number
+of partitions instead of the number of strings. partitions_at_depth
+returns them as compact arrays, a partition's id is its position in that
+order.
+
+The number of partitions itself still grows quickly (about 1.7 million at
+depth 64, 9e15 at depth 300). Evaluating probabilities only needs, for
+each number of sub-strings M, the sum over compositions of a product of
+per-length weights, which composition_weights computes by dynamic
+programming in O(D^2 * M) for every depth up to D (depth 300 takes well
+under a second).
+
+Running as a main/script checks both against the recursive enumeration
+and times them.
+"""
+from collections import Counter, namedtuple
+import math
+
+import numpy as np
+
+
+class PartitionCounts(namedtuple("PartitionCounts", ['depth', 'offsets', 'parts', 'counts'])):
+    """Partitions of depth and how many strings reorder to each.
+
+    Partition i has parts parts[offsets[i]:offsets[i+1]] (ascending) and counts[i] strings. counts are uint64
+    (exact) up to depth 64 and float64 beyond that.
+    """
+
+    def __len__(self):
+        return len(self.counts)
+
+    def partition(self, i) -> tuple:
+        return tuple(int(p) for p in self.parts[self.offsets[i]:self.offsets[i + 1]])
+
+    def num_parts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def to_counter(self) -> Counter:
+        """Same form as binary_sub_strings.count_unordered_strings_at_depth."""
+        return Counter({self.partition(i): int(c) for i, c in enumerate(self.counts)})
+
+
+def ascending_partitions(n):
+    """Generate the partitions of n as ascending lists (Kelleher's accelerated ascending algorithm)."""
+    a = [0] * (n + 1)
+    k = 1
+    y = n - 1
+    while k != 0:
+        x = a[k - 1] + 1
+        k -= 1
+        while 2 * x <= y:
+            a[k] = x
+            y -= x
+            k += 1
+        l = k + 1
+        while x <= y:
+            a[k] = x
+            a[l] = y
+            yield a[:k + 2]
+            x += 1
+            y -= 1
+        a[k] = x + y
+        y = x + y - 1
+        yield a[:k + 1]
+
+
+def _orderings(parts):
+    """Number of distinct orderings of the (sorted) parts, M!/prod(m_L!)."""
+    count = math.factorial(len(parts))
+    run = 1
+    for prev, part in zip(parts, parts[1:]):
+        if part == prev:
+            run += 1
+            count //= run
+        else:
+            run = 1
+    return count
+
+
+def partitions_at_depth(D) -> PartitionCounts:
+    offsets = [0]
+    parts = []
+    counts = []
+    for partition in ascending_partitions(D):
+        parts.extend(partition)
+        offsets.append(len(parts))
+        counts.append(_orderings(partition))
+    count_type = np.uint64 if D <= 64 else np.float64
+    return PartitionCounts(D, np.array(offsets, dtype=np.int64), np.array(parts, dtype=np.uint16),
+                           np.array(counts, dtype=count_type))
+
+
+def composition_weights(max_depth, weights=None) -> np.ndarray:
+    """W[D, M]: sum over compositions of D into M parts of prod(weights[L] for each part length L).
+
+    weights is indexed by part length (weights[0] is unused), all ones if None, in which case W[D, M] is the
+    number of strings at depth D with M sub-strings. Shape is (max_depth+1, max_depth+1).
+    """
+    if weights is None:
+        weights = np.ones(max_depth + 1)
+    weights = np.asarray(weights, dtype=float)[:max_depth + 1]
+    W = np.zeros((max_depth + 1, max_depth + 1))
+    W[0, 0] = 1.0
+    for D in range(1, max_depth + 1):
+        ## last part has length L = 1..D: W[D, M] = sum_L weights[L] * W[D-L, M-1]
+        W[D, 1:] = weights[D:0:-1] @ W[:D, :-1]
+    return W
+
+
+if __name__ == "__main__":
+    import time
+    from . import binary_sub_strings
+
+    for D in range(1, 16):
+        assert partitions_at_depth(D).to_counter() == binary_sub_strings.count_unordered_strings_at_depth(D)
+    print("Partition counts match the recursive enumeration up to depth 15.")
+
+    for D in [40, 50, 60]:
+        start_time = time.perf_counter()
+        result = partitions_at_depth(D)
+        end_time = time.perf_counter()
+        assert int(result.counts.sum()) == 2 ** (D - 1)
+        print(f"Depth {D}: {len(result):,} partitions in {end_time - start_time:.2f} seconds")
+
+    start_time = time.perf_counter()
+    W = composition_weights(300)
+    end_time = time.perf_counter()
+    assert W[20, 5] == math.comb(19, 4)
+    print(f"Composition weights to depth 300 took {end_time - start_time:.3f} seconds")
@@ -0,0 +1,162 @@
+"""
+Monte Carlo of the days a multi-stage breeding plan takes.
+
+A plan is a sequence of stages, each starting once the previous one has
+produced its flower:
+
+    clone   the previous flower (and/or seeds) is cloned up to clone_to copies
+    breed   num_pairs freshly watered pairs breed until any of them produces
+            the stage's flower, each child being it with probability p
+
+Stages may each have their own number of visitors, the watering rules
+otherwise come from the plan (rules.WateringRules). A plan can be built
+directly, e.g. asteriation_blue_roses(), or from a path through a
+ProbabilityChain graph (BreedingPlan.from_chain_path).
+
+Trials run in batches, each stage sampled for the whole batch at once with
+numpy (a breeding stage is the minimum of num_pairs independent
+monte_carlo.simulate_pair_progeny times, a cloning stage comes from
+cloning.simulate_clone_times). Only a histogram of total days and per
+stage sums are kept (PlanSummary), so memory does not grow with trials.
+
+Running as a main/script simulates Asteriation's blue rose plan.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from . import cloning
+from . import monte_carlo
+from .rules import DEFAULT_RULES, WateringRules
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One step of a plan, see the module docstring. A stage with breed=False only clones.
+
+    visitors overrides the number of visitors of the plan's rules for this stage if not None.
+    """
+    name: str
+    probability: float = 1.0
+    num_pairs: int = 1
+    clone_to: int = 1
+    visitors: int = None
+    breed: bool = True
+
+    def sample(self, samples, rng, rules) -> np.ndarray:
+        """Days this stage takes in each of samples trials."""
+        if self.visitors is not None:
+            rules = rules.with_visitors(self.visitors)
+        days = np.zeros(samples, dtype=np.int64)
+        if self.clone_to > 1:
+            days += cloning.simulate_clone_times(self.clone_to, samples, rng=rng, rules=rules)
+        if self.breed:
+            pair_days = monte_carlo.simulate_pair_progeny(self.probability, samples * self.num_pairs, rng, rules=rules)
+            days += pair_days.reshape(samples, self.num_pairs).min(axis=1)
+        return days
+
+
+@dataclass
+class BreedingPlan:
+    stages: list
+    rules: WateringRules = field(default=DEFAULT_RULES)
+
+    @classmethod
+    def from_chain_path(cls, graph, path, num_pairs=1, visitors=None, rules=DEFAULT_RULES):
+        """Plan breeding each child along a ProbabilityChain path [seed, pair, child, pair, child, ...]."""
+        stages = []
+        for i in range(1, len(path) - 1, 2):
+            pair, child = path[i], path[i + 1]
+            f1, f2 = pair
+            stages.append(Stage(f"{f1} x {f2} -> {child}", graph[pair][child]['probability'], num_pairs,
+                                visitors=visitors))
+        return cls(stages, rules)
+
+    def sample(self, trials, rng=None) -> np.ndarray:
+        """Days each stage took, one row per trial and one column per stage."""
+        rng = np.random.default_rng(rng)
+        return np.column_stack([stage.sample(trials, rng, self.rules) for stage in self.stages])
+
+    def simulate(self, trials, rng=None, batch_size=10000, summary=None):
+        """Run trials of the whole plan, returns a PlanSummary (summary, updated, if given)."""
+        rng = np.random.default_rng(rng)
+        summary = summary if summary is not None else PlanSummary([stage.name for stage in self.stages])
+        for start in range(0, trials, batch_size):
+            summary.add(self.sample(min(batch_size, trials - start), rng))
+        return summary
+
+
+class PlanSummary:
+    """Histogram of total days per trial and per stage sums, merged over batches."""
+
+    def __init__(self, stage_names):
+        self.stage_names = list(stage_names)
+        self.trials = 0
+        self.counts = np.zeros(0, dtype=np.int64)  # counts[d]: trials finishing on day d
+        self.stage_sums = np.zeros(len(self.stage_names))
+
+    def __repr__(self):
+        return f"<PlanSummary {len(self.stage_names)} stages: {self.trials} trials>"
+
+    def add(self, stage_days):
+        """Add a batch, stage_days has one row per trial and one column per stage."""
+        totals = stage_days.sum(axis=1)
+        self._add_counts(np.bincount(totals))
+        self.trials += len(totals)
+        self.stage_sums += stage_days.sum(axis=0)
+
+    def _add_counts(self, counts):
+        if len(counts) > len(self.counts):
+            counts, self.counts = self.counts, counts.copy()
+        self.counts[:len(counts)] += counts
+
+    def merge(self, other):
+        self._add_counts(other.counts)
+        self.trials += other.trials
+        self.stage_sums += other.stage_sums
+        return self
+
+    def quantile(self, q):
+        """Days within which fraction q of the trials finished (q may be an array)."""
+        return np.searchsorted(np.cumsum(self.counts), np.asarray(q) * self.trials)
+
+    def cdf(self) -> np.ndarray:
+        """Fraction of trials finished by each day 0..longest."""
+        return np.cumsum(self.counts) / self.trials
+
+    def mean(self):
+        return float(np.arange(len(self.counts)) @ self.counts / self.trials)
+
+    def stage_means(self) -> dict:
+        return dict(zip(self.stage_names, self.stage_sums / self.trials))
+
+
+def asteriation_blue_roses(num_pairs=8, visitors=0, clone=True):
+    """Asteriation's 4-step path to blue roses (see asteriation4).
+
+    The first step pairs seeds, num_pairs at once. If clone, each new flower is cloned to num_pairs copies
+    (2*num_pairs reds for the last step) before breeding, else it breeds as a single pair (the red cloned once).
+    """
+    pairs = num_pairs if clone else 1
+    return BreedingPlan([
+        Stage("A 0010 white x 0010 white -> 0020 purple", 0.25, num_pairs, visitors=visitors),
+        Stage("B 0020 purple x 2001 red -> 1011 pink", 0.5, pairs, pairs, visitors),
+        Stage("C 1011 pink x 0200 yellow -> 1110 red", 0.125, pairs, pairs, visitors),
+        Stage("E 1110 red x 1110 red -> 2220 blue", 0.015625, pairs, 2 * pairs, visitors),
+    ])
+
+
+if __name__ == "__main__":
+    import time
+
+    for clone, visitors in [(False, 0), (True, 0), (True, 2)]:
+        plan = asteriation_blue_roses(visitors=visitors, clone=clone)
+        start_time = time.perf_counter()
+        summary = plan.simulate(50000, rng=1)
+        end_time = time.perf_counter()
+        q50, q95 = summary.quantile([0.5, 0.95])
+        print(f"{'Cloning' if clone else 'Single pairs'}, {visitors} visitors: {summary.trials} trials in "
+              f"{end_time - start_time:.2f} seconds, "
+              f"median {q50} days, 95% within {q95} days, mean {summary.mean():.1f}")
+        for name, mean in summary.stage_means().items():
+            print(f"\t{name}: {mean:.1f} days on average")
@@ -0,0 +1,185 @@
+"""
+Pipeline which (re)builds the precomputed csv tables of this package.
+
+Each stage writes one or more csv files and may read the outputs of
+other stages:
+
+    pmfs        ProbabilityMassFunctions.csv (exact, watering_chain)
+    cloning     CloningTable.csv
+    pairs       PairBreedingTable.csv                                     (needs pmfs)
+    strategies  CloningPairsThenBreedingTimes.csv, CloningThenBreedingSelfTimes.csv  (needs pmfs)
+
+A stage's key is a hash of its name, parameters, the hashes of the files
+it reads and the source of the modules which compute it. The keys and
+the hashes of the files written are kept in a manifest in the output
+directory, a stage whose key and outputs are unchanged is skipped.
+Stages whose inputs are ready run in parallel worker processes.
+
+Running as a main/script brings the tables in this package's directory
+up to date (pass --force to rebuild everything, or another output
+directory).
+"""
+from collections import namedtuple
+import concurrent.futures
+import hashlib
+import inspect
+import json
+import pathlib
+
+import pandas as pd
+
+from . import analytic_approximation
+from . import analytic_results
+from . import cloning
+from . import multiple_pairs_time
+from . import rules
+from . import watering_chain
+
+MANIFEST = "precompute_manifest.json"
+DEFAULT_DIR = pathlib.Path(__file__).parent
+PXS = [2.0 ** -k for k in range(9)]  # 1.0, 0.5, ..., 0.00390625
+
+Stage = namedtuple("Stage", ['name', 'function', 'outputs', 'inputs', 'modules', 'params'])
+
+
+def build_pmfs(out_dir, inputs, params):
+    days = params['days']
+    result = watering_chain.pmf(params['pxs'], days)
+    df = pd.DataFrame(result.T, columns=[f"P(x)={px}" for px in params['pxs']],
+                      index=pd.RangeIndex(1, days + 1, name='Day'))
+    df.to_csv(out_dir / "ProbabilityMassFunctions.csv")
+
+
+def build_cloning(out_dir, inputs, params):
+    multiple_pairs_time.build_cloning_table().to_csv(out_dir / "CloningTable.csv", index=False)
+
+
+def build_pairs(out_dir, inputs, params):
+    pmfs = analytic_approximation.load(inputs["ProbabilityMassFunctions.csv"])
+    multiple_pairs_time.build_pair_breeding_table(pmfs).to_csv(out_dir / "PairBreedingTable.csv", index=False)
+
+
+def build_strategies(out_dir, inputs, params):
+    pmfs = analytic_approximation.load(inputs["ProbabilityMassFunctions.csv"])
+    multiple_pairs_time.build_fastest_pair_strategy_table(pmfs).to_csv(
+        out_dir / "CloningPairsThenBreedingTimes.csv", index=False)
+    multiple_pairs_time.build_fastest_self_breed_strategy_table(pmfs).to_csv(
+        out_dir / "CloningThenBreedingSelfTimes.csv", index=False)
+
+
+STAGES = [
+    Stage("pmfs", build_pmfs, ["ProbabilityMassFunctions.csv"], [],
+          [watering_chain, analytic_results, rules], {'pxs': PXS, 'days': 75}),
+    Stage("cloning", build_cloning, ["CloningTable.csv"], [],
+          [multiple_pairs_time, cloning, analytic_results, rules], {}),
+    Stage("pairs", build_pairs, ["PairBreedingTable.csv"], ["ProbabilityMassFunctions.csv"],
+          [multiple_pairs_time, analytic_approximation], {}),
+    Stage("strategies", build_strategies, ["CloningPairsThenBreedingTimes.csv", "CloningThenBreedingSelfTimes.csv"],
+          ["ProbabilityMassFunctions.csv"], [multiple_pairs_time, cloning, analytic_results, analytic_approximation, rules], {}),
+]
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def stage_key(stage, input_hashes):
+    h = hashlib.sha256()
+    h.update(json.dumps([stage.name, stage.params, [input_hashes[i] for i in stage.inputs]]).encode())
+    for module in stage.modules + [inspect.getmodule(stage.function)]:
+        h.update(inspect.getsource(module).encode())
+    return h.hexdigest()
+
+
+def load_manifest(out_dir):
+    path = pathlib.Path(out_dir) / MANIFEST
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def is_current(out_dir, entry, key):
+    """True if entry (from the manifest) has key and all its outputs still have their recorded hashes."""
+    if entry is None or entry['key'] != key:
+        return False
+    return all((out_dir / name).exists() and file_hash(out_dir / name) == h for name, h in entry['outputs'].items())
+
+
+def _run_stage(name, out_dir, inputs):
+    stage = next(stage for stage in STAGES if stage.name == name)
+    stage.function(out_dir, inputs, stage.params)
+    return {name: file_hash(out_dir / name) for name in stage.outputs}
+
+
+def run(out_dir=None, stages=None, force=False, processes=None, verbose=False):
+    """Bring the outputs of stages (names, default all) and the stages they need up to date in out_dir.
+
+    Returns a dict of stage name -> True if it was rebuilt, False if it was already current.
+    """
+    out_dir = pathlib.Path(out_dir if out_dir is not None else DEFAULT_DIR)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    by_name = {stage.name: stage for stage in STAGES}
+    producer = {output: stage.name for stage in STAGES for output in stage.outputs}
+
+    wanted = set()
+    todo = list(stages if stages is not None else by_name)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(producer[i] for i in by_name[name].inputs)
+
+    manifest = load_manifest(out_dir)
+    hashes = {}
+    keys = {}
+    rebuilt = {}
+    running = {}
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        while len(rebuilt) < len(wanted):
+            for name in sorted(wanted - set(rebuilt) - set(running.values())):
+                stage = by_name[name]
+                if not all(producer[i] in rebuilt for i in stage.inputs):
+                    continue
+                key = stage_key(stage, hashes)
+                if not force and is_current(out_dir, manifest.get(name), key):
+                    hashes.update(manifest[name]['outputs'])
+                    rebuilt[name] = False
+                    if verbose:
+                        print(f"{name}: up to date")
+                    continue
+                inputs = {i: out_dir / i for i in stage.inputs}
+                running[pool.submit(_run_stage, name, out_dir, inputs)] = name
+                keys[name] = key
+            if len(rebuilt) == len(wanted):
+                break
+            if not running:
+                continue
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                outputs = future.result()
+                hashes.update(outputs)
+                manifest[name] = {'key': keys[name], 'outputs': outputs}
+                rebuilt[name] = True
+                if verbose:
+                    print(f"{name}: rebuilt {', '.join(outputs)}")
+                with open(out_dir / MANIFEST, 'w') as f:
+                    json.dump(manifest, f, indent=2, sort_keys=True)
+    return rebuilt
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Rebuild the precomputed breeding time tables.")
+    parser.add_argument("out_dir", nargs='?', default=None)
+    parser.add_argument("--force", action='store_true')
+    parser.add_argument("--stage", action='append', dest='stages')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    run(args.out_dir, args.stages, args.force, verbose=True)
+    print(f"Took {time.perf_counter() - start_time:.1f} seconds")
@@ -0,0 +1,96 @@
+"""
+Rules for how likely a watered flower is to breed (or clone) on a day.
+
+A flower's chance depends on its watering count, the number of days since
+it last bred (1 the day after), up to a cap after which it stays the same,
+plus a bonus when other players (visitors) water it too. A pair breeds if
+either flower does. WateringRules holds one such rule set; it is frozen
+and hashable so results computed for it can be cached per rule set, and
+its chances are compiled to numpy arrays once.
+
+DEFAULT_RULES is the rule set every module uses unless given another:
+0.05 below 4 waterings, then 0.1 rising 0.05 per watering to 0.9 at the
+cap of 20, no visitors.
+"""
+from dataclasses import dataclass, field, replace
+import functools
+
+import numpy as np
+
+MAX_COUNT = 20
+
+
+def _default_base_chances(cap=MAX_COUNT):
+    return tuple(0.05 if w < 4 else 0.1 + (w - 4) * 0.05 for w in range(1, cap + 1))
+
+
+@dataclass(frozen=True)
+class WateringRules:
+    """base_chances[w-1] is a single flower's chance at watering count w = 1..cap (counts past cap use the last).
+
+    visitor_bonuses[n] is added for n visitors (the last entry for any more), the sum is capped at 1.
+    """
+    base_chances: tuple = field(default_factory=_default_base_chances)
+    visitor_bonuses: tuple = (0.0, 0.2, 0.3, 0.45, 0.60, 0.75)
+    visitors: int = 0
+    cap: int = MAX_COUNT
+
+    def __post_init__(self):
+        object.__setattr__(self, 'base_chances', tuple(float(p) for p in self.base_chances))
+        object.__setattr__(self, 'visitor_bonuses', tuple(float(b) for b in self.visitor_bonuses))
+        if len(self.base_chances) != self.cap:
+            raise ValueError(f"Need a base chance for every watering count 1..{self.cap}. Saw {len(self.base_chances)}.")
+        if self.visitors < 0:
+            raise ValueError("Number of visitors must be a positive integer.")
+        if not all(0 <= p <= 1 for p in self.base_chances + self.visitor_bonuses):
+            raise ValueError("Chances must be between 0 and 1.")
+        object.__setattr__(self, '_hash', hash((self.base_chances, self.visitor_bonuses, self.visitors, self.cap)))
+
+    def __hash__(self):
+        ## rule sets are part of many cache keys, hash the fields once
+        return self._hash
+
+    def with_visitors(self, visitors):
+        return _with_visitors(self, visitors)
+
+    def visitor_bonus(self):
+        return self.visitor_bonuses[min(self.visitors, len(self.visitor_bonuses) - 1)]
+
+    def single_chance(self, water_count):
+        """Chance a single flower breeds at water_count (counts below 1 are 1, above the cap are the cap)."""
+        return float(self.single_probs()[min(max(water_count, 1), self.cap) - 1])
+
+    def pair_chance(self, water_count):
+        """Chance either flower of a pair breeds at water_count."""
+        return float(self.pair_probs()[min(max(water_count, 1), self.cap) - 1])
+
+    def single_probs(self) -> np.ndarray:
+        """Single flower chances at watering counts 1..cap (index 0 is count 1), read only."""
+        return _single_probs(self)
+
+    def pair_probs(self) -> np.ndarray:
+        """Pair chances at watering counts 1..cap (index 0 is count 1), read only."""
+        return _pair_probs(self)
+
+
+@functools.lru_cache(maxsize=256)
+def _with_visitors(rules, visitors):
+    return rules if visitors == rules.visitors else replace(rules, visitors=visitors)
+
+
+@functools.lru_cache(maxsize=None)
+def _single_probs(rules):
+    s = np.minimum(np.array(rules.base_chances) + rules.visitor_bonus(), 1.0)
+    s.flags.writeable = False
+    return s
+
+
+@functools.lru_cache(maxsize=None)
+def _pair_probs(rules):
+    s = _single_probs(rules)
+    q = s + s - s * s  # same as analytic_results.p_or(s, s)
+    q.flags.writeable = False
+    return q
+
+
+DEFAULT_RULES = WateringRules()
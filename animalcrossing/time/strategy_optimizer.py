@@ -0,0 +1,166 @@
+"""
+Search for the fastest way to breed a flower X from a single parent
+flower, by cloning it and breeding the clones, allowing hybrid policies.
+
+multiple_pairs_time's strategy tables only consider "clone to N flowers,
+then breed them all". Here a Policy decides each day which unpaired flowers
+(cloners) become pairs:
+
+    mode         "seed": each converted flower pairs with a seed partner,
+                 "self": converted flowers pair with each other
+    clone_until  nothing is paired until at least this many flowers are held
+    reserve      afterwards all but this many cloners are paired as they appear
+    max_pairs    no more pairs are made once this many exist
+
+so clone_until=N, reserve=0 is the strict "clone to N" policy and
+clone_until=1, reserve=r keeps r flowers cloning while every new clone
+starts breeding. Cloners clone with the single flower chance, pairs breed
+with the pair chance of their own watering counts (rules.WateringRules),
+new pairs start freshly watered and the freshest cloners are paired first.
+A breeding gives X with probability px, the trial ends on the first X.
+
+simulate_policy runs many trials at once in numpy, tracking per trial
+the number of cloners and pairs at every watering count. optimize
+simulates every policy with the same random streams and reports, for every
+alpha at once, the policy with the fewest days to X at that confidence.
+Times are numbers throughout, NaN when not reached within max_days.
+
+Running as a main/script compares the best hybrid policies to the
+strict ones for a few px.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .rules import DEFAULT_RULES
+
+MODES = ("seed", "self")
+
+Policy = namedtuple("Policy", ['mode', 'clone_until', 'reserve', 'max_pairs'])
+
+
+def default_policies(max_pairs=32):
+    """Strict clone-then-breed policies and, for both modes, hybrids which clone to n flowers and then keep
+    1 or n/2 of them cloning while the rest (and every new clone) breed, up to 2n or 4n pairs."""
+    policies = []
+    sizes = [n for n in (1, 2, 4, 8, 16, 32, 64) if n <= max_pairs]
+    for n in sizes:
+        policies.append(Policy("seed", n, 0, n))
+        policies.append(Policy("self", 2 * n, 0, n))
+    for n in sizes[1:]:
+        for reserve in sorted({1, n // 2}):
+            for m in (2 * n, 4 * n):
+                if m <= max_pairs:
+                    policies.append(Policy("seed", n, reserve, m))
+                    policies.append(Policy("self", 2 * n, 2 * reserve, m))
+    return policies
+
+
+def _advance(counts, fired, new_per_fired):
+    """Next day's counts by watering count: fired ones restart at count 1 (new_per_fired each), others move up."""
+    held = counts - fired
+    result = np.zeros_like(counts)
+    result[:, 0] = new_per_fired * fired.sum(axis=1)
+    result[:, 1:] = held[:, :-1]
+    result[:, -1] += held[:, -1]
+    return result
+
+
+def _convert(policy, cloners, pairs, breeding):
+    """Pair up cloners as policy allows, the freshest (lowest watering count) first."""
+    per_pair = 1 if policy.mode == "seed" else 2
+    num_cloners = cloners.sum(axis=1)
+    num_pairs = pairs.sum(axis=1)
+    breeding = breeding | (num_cloners + per_pair * num_pairs >= policy.clone_until)
+    new_pairs = np.minimum((num_cloners - policy.reserve) // per_pair, policy.max_pairs - num_pairs)
+    new_pairs = np.where(breeding, np.maximum(new_pairs, 0), 0)
+    if new_pairs.any():
+        used = (new_pairs * per_pair)[:, None]
+        before = np.cumsum(cloners, axis=1) - cloners
+        cloners = cloners - np.clip(used - before, 0, cloners)
+        pairs = pairs.copy()
+        pairs[:, 0] += new_pairs
+    ## once all pairs are made the remaining cloners can no longer matter (and would grow without bound)
+    cloners = np.where((pairs.sum(axis=1) >= policy.max_pairs)[:, None], 0, cloners)
+    return cloners, pairs, breeding
+
+
+def simulate_policy(px, policy, samples, rng=None, rules=None, max_days=1000) -> np.ndarray:
+    """Day X was first bred in each of samples trials starting from one fresh flower, np.inf if after max_days."""
+    rng = np.random.default_rng(rng)
+    rules = rules or DEFAULT_RULES
+    s = rules.single_probs()
+    q = rules.pair_probs()
+    days = np.full(samples, np.inf)
+    waiting = np.arange(samples)
+    cloners = np.zeros((samples, s.size), dtype=np.int64)
+    cloners[:, 0] = 1
+    pairs = np.zeros_like(cloners)
+    breeding = np.zeros(samples, dtype=bool)
+    cloners, pairs, breeding = _convert(policy, cloners, pairs, breeding)
+    for day in range(1, max_days + 1):
+        clones = rng.binomial(cloners, s) if cloners.any() else cloners
+        bred = rng.binomial(pairs, q)
+        success = rng.binomial(bred.sum(axis=1), px) > 0
+        days[waiting[success]] = day
+        keep = ~success
+        waiting = waiting[keep]
+        if not waiting.size:
+            break
+        cloners = _advance(cloners[keep], clones[keep], 2)
+        pairs = _advance(pairs[keep], bred[keep], 1)
+        cloners, pairs, breeding = _convert(policy, cloners, pairs, breeding[keep])
+    return days
+
+
+def policy_quantiles(days, alphas) -> np.ndarray:
+    """Days by which fraction alpha of the trials had X (NaN if some never did by then)."""
+    days = np.sort(days)
+    idx = np.ceil(np.asarray(alphas) * len(days)).astype(int) - 1
+    t = days[np.clip(idx, 0, len(days) - 1)]
+    return np.where(np.isinf(t), np.nan, t)
+
+
+def evaluate_policies(px, alphas=(0.25, 0.5, 0.75, 0.95), policies=None, samples=4000, seed=0, rules=None,
+                      max_days=1000) -> pd.DataFrame:
+    """Quantile times of every policy (one row per policy, one column per alpha), all from the same random streams."""
+    policies = policies if policies is not None else default_policies()
+    rows = []
+    for policy in policies:
+        days = simulate_policy(px, policy, samples, np.random.default_rng(seed), rules, max_days)
+        rows.append(list(policy) + [np.mean(np.isfinite(days))] + list(policy_quantiles(days, alphas)))
+    header = ["Mode", "Clone Until", "Reserve", "Max Pairs", "Found"] + [f"Time (alpha={a})" for a in alphas]
+    return pd.DataFrame(rows, columns=header)
+
+
+def optimize(pxs, alphas=(0.25, 0.5, 0.75, 0.95), policies=None, samples=4000, seed=0, rules=None,
+             max_days=1000) -> pd.DataFrame:
+    """Best policy at every alpha for every px: one row per (px, alpha), numeric columns (Time NaN if never reached)."""
+    rows = []
+    for px in np.atleast_1d(pxs):
+        table = evaluate_policies(px, alphas, policies, samples, seed, rules, max_days)
+        for alpha in alphas:
+            times = table[f"Time (alpha={alpha})"]
+            if times.isna().all():
+                rows.append([px, alpha, np.nan, None, np.nan, np.nan, np.nan])
+                continue
+            best = table.loc[times.idxmin()]
+            rows.append([px, alpha, times.min(), best["Mode"], best["Clone Until"], best["Reserve"], best["Max Pairs"]])
+    header = ["Prob(X)", "Confidence Level (alpha)", "Time", "Mode", "Clone Until", "Reserve", "Max Pairs"]
+    return pd.DataFrame(rows, columns=header)
+
+
+if __name__ == "__main__":
+    import time
+
+    pxs = [0.25, 0.0625, 0.015625]
+    start_time = time.perf_counter()
+    best = optimize(pxs)
+    print(f"Optimized {len(default_policies())} policies for {len(pxs)} px in {time.perf_counter() - start_time:.1f} seconds")
+    print(best.to_string(index=False))
+
+    strict = [p for p in default_policies() if p.reserve == 0]
+    print()
+    print("Strict clone then breed policies only:")
+    print(optimize(pxs, policies=strict).to_string(index=False))
@@ -0,0 +1,181 @@
+"""
+Single file store for the precomputed string (partition) counts
+of partition_counts, replacing one pickled StringComputation per depth.
+
+Layout (little endian, every block 8 byte aligned):
+    header: magic b"STRSTORE", version (uint32), number of depths (uint32)
+    index:  one entry per depth: depth (uint32), count type (uint32, 0 uint64, 1 float64),
+            number of partitions, number of parts, byte offset of the depth's data (uint64 each)
+    data:   per depth: offsets (int64, partitions+1), parts (uint16, padded), counts (8 bytes each)
+
+Opening a store only reads the header and index; a depth's arrays are
+numpy views into a memory map of the file, created the first time that
+depth is asked for. The store is not part of the repository: build()
+writes it, by default to StringCounts.bin in the user cache directory
+($ANIMALCROSSING_CACHE, else $XDG_CACHE_HOME/animalcrossing, else
+~/.cache/animalcrossing). open_store() without a path opens that file,
+or a StringCounts.bin shipped in animalcrossing.resources if there is one.
+
+Running as a main/script builds the default store (up to depth 40
+unless another depth is given as the first argument).
+"""
+from collections.abc import Mapping
+import glob
+import importlib.resources
+import mmap
+import os
+import pathlib
+import pickle
+import struct
+
+import numpy as np
+
+from .partition_counts import PartitionCounts, partitions_at_depth
+
+_MAGIC = b"STRSTORE"
+_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+_ENTRY = struct.Struct("<IIQQQ")
+_COUNT_TYPES = [np.dtype("<u8"), np.dtype("<f8")]
+
+RESOURCE_PACKAGE = "animalcrossing.resources"
+RESOURCE_NAME = "StringCounts.bin"
+
+
+def _padded(n):
+    return (n + 7) // 8 * 8
+
+
+def write_store(path, results):
+    """Write an iterable of PartitionCounts (one per depth) to a new store at path."""
+    results = sorted(results, key=lambda r: r.depth)
+    offset = _HEADER.size + _ENTRY.size * len(results)
+    entries = []
+    for r in results:
+        count_type = 0 if r.counts.dtype.kind == 'u' else 1
+        entries.append((r.depth, count_type, len(r.counts), len(r.parts), offset))
+        offset += 8 * len(r.offsets) + _padded(2 * len(r.parts)) + 8 * len(r.counts)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(results)))
+        for entry in entries:
+            f.write(_ENTRY.pack(*entry))
+        for r, entry in zip(results, entries):
+            assert f.tell() == entry[-1]
+            f.write(r.offsets.astype("<i8").tobytes())
+            parts = r.parts.astype("<u2").tobytes()
+            f.write(parts + bytes(_padded(len(parts)) - len(parts)))
+            f.write(r.counts.astype(_COUNT_TYPES[entry[1]]).tobytes())
+
+
+class StringStore(Mapping):
+    """Read only mapping of depth -> PartitionCounts backed by a memory mapped store file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, num_depths = _HEADER.unpack_from(self.map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} string count store.")
+        self._index = {}
+        for i in range(num_depths):
+            entry = _ENTRY.unpack_from(self.map, _HEADER.size + i * _ENTRY.size)
+            self._index[entry[0]] = entry
+        self._loaded = {}
+
+    def __repr__(self):
+        return f"<StringStore {self.path}: depths {min(self, default=None)}..{max(self, default=None)}>"
+
+    def __getitem__(self, depth) -> PartitionCounts:
+        if depth not in self._loaded:
+            _, count_type, n, num_parts, offset = self._index[depth]
+            offsets = np.frombuffer(self.map, "<i8", n + 1, offset)
+            offset += 8 * (n + 1)
+            parts = np.frombuffer(self.map, "<u2", num_parts, offset)
+            offset += _padded(2 * num_parts)
+            counts = np.frombuffer(self.map, _COUNT_TYPES[count_type], n, offset)
+            self._loaded[depth] = PartitionCounts(depth, offsets, parts, counts)
+        return self._loaded[depth]
+
+    def __iter__(self):
+        return iter(sorted(self._index))
+
+    def __len__(self):
+        return len(self._index)
+
+    def close(self):
+        """Close the memory map, arrays returned from this store must not be used afterwards."""
+        self._loaded.clear()
+        self.map.close()
+
+
+def cache_dir() -> pathlib.Path:
+    """Directory the default store is built in."""
+    if "ANIMALCROSSING_CACHE" in os.environ:
+        return pathlib.Path(os.environ["ANIMALCROSSING_CACHE"])
+    base = os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache"
+    return pathlib.Path(base) / "animalcrossing"
+
+
+def default_path() -> pathlib.Path:
+    return cache_dir() / RESOURCE_NAME
+
+
+def open_store(path=None) -> StringStore:
+    """Open the store at path, or if None the default store (see the module docstring).
+
+    Raises FileNotFoundError, saying how to build it, if there is no default store yet.
+    """
+    if path is not None:
+        return StringStore(path)
+    if default_path().exists():
+        return StringStore(default_path())
+    resource = importlib.resources.files(RESOURCE_PACKAGE).joinpath(RESOURCE_NAME)
+    if resource.is_file():
+        with importlib.resources.as_file(resource) as resource_path:
+            return StringStore(resource_path)
+    raise FileNotFoundError(f"No string count store at {default_path()}. Build it first with "
+                            f"animalcrossing.time.string_store.build(40) or python -m animalcrossing.time.string_store")
+
+
+def build(max_depth, path=None):
+    """Compute the partition counts for depths 1..max_depth and write them to path (default: default_path())."""
+    path = pathlib.Path(path) if path is not None else default_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_store(path, (partitions_at_depth(D) for D in range(1, max_depth + 1)))
+    return path
+
+
+def convert_pickles(pattern, path):
+    """Write the StringComputation pickles matching pattern (e.g. "./*LinearProg*.pickle") to one store."""
+    results = []
+    for fname in glob.glob(pattern):
+        with open(fname, 'rb') as f:
+            computation = pickle.load(f)
+        offsets = [0]
+        parts = []
+        counts = []
+        for partition, count in computation.counts.items():
+            parts.extend(partition)
+            offsets.append(len(parts))
+            counts.append(count)
+        count_type = np.uint64 if computation.depth <= 64 else np.float64
+        results.append(PartitionCounts(computation.depth, np.array(offsets, dtype=np.int64),
+                                       np.array(parts, dtype=np.uint16), np.array(counts, dtype=count_type)))
+    write_store(path, results)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    max_depth = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    start_time = time.perf_counter()
+    path = build(max_depth)
+    print(f"Built {path} to depth {max_depth} in {time.perf_counter() - start_time:.1f} seconds")
+
+    store = open_store()
+    print(store)
+    start_time = time.perf_counter()
+    record = store[max_depth]
+    print(f"Loaded depth {max_depth} ({len(record):,} partitions) in {time.perf_counter() - start_time:.4f} seconds")
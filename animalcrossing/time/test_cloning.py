@@ -0,0 +1,44 @@
+"""
+Tests for animalcrossing.time.cloning: the exact population
+distribution against its own seeded Monte Carlo.
+
+Run with pytest.
+"""
+import numpy as np
+import pytest
+
+from animalcrossing.time import cloning
+from animalcrossing.time.rules import DEFAULT_RULES
+
+
+def test_first_day():
+    s = cloning.clone_probs()[0]
+    P = cloning.population_pmf(1, 4, starters=2)
+    assert np.allclose(P[0], [0, 0, 1, 0, 0])
+    assert np.allclose(P[1], [0, 0, (1 - s) ** 2, 2 * s * (1 - s), s ** 2])
+
+
+def test_pmf_rows_sum_to_one():
+    P = cloning.population_pmf(40, 16, starters=3)
+    assert np.allclose(P.sum(axis=1), 1.0)
+    assert np.all(np.diff(P[:, -1]) >= -1e-12)  # at least 16 flowers only gets likelier
+
+
+@pytest.mark.parametrize("rules", [DEFAULT_RULES, DEFAULT_RULES.with_visitors(1)])
+def test_exact_matches_monte_carlo(rules):
+    xs = np.arange(1, 17)
+    exact = cloning.prob_at_least(xs, 30, starters=2, rules=rules)
+    sims = cloning.simulate_population(2, 30, 20000, rng=0, rules=rules)
+    mc = (sims[:, :, None] >= xs).mean(axis=0)
+    assert np.abs(exact - mc).max() < 0.02
+
+
+def test_clone_times_match_exact():
+    x = 8
+    times = cloning.simulate_clone_times(x, 20000, rng=1)
+    exact = cloning.prob_at_least([x], 60)[:, 0]
+    mc = (times[:, None] <= np.arange(61)).mean(axis=0)
+    assert np.abs(exact - mc).max() < 0.02
+    assert cloning.time_to_x(x, 0.5) == np.argmax(exact >= 0.5)
+    assert cloning.times_to_x([x], [0.5, 0.9])[:, 0].tolist() == [cloning.time_to_x(x, 0.5), cloning.time_to_x(x, 0.9)]
+    assert cloning.time_to_x(2, 0.5, starters=2) == 0
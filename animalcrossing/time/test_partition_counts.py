@@ -0,0 +1,44 @@
+"""
+Tests for animalcrossing.time.partition_counts against the recursive
+enumeration of binary_sub_strings.
+
+Run with pytest.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from animalcrossing.time import binary_sub_strings
+from animalcrossing.time.partition_counts import composition_weights, partitions_at_depth
+
+
+@pytest.mark.parametrize("D", range(1, 13))
+def test_partition_counts_match_enumeration(D):
+    assert partitions_at_depth(D).to_counter() == binary_sub_strings.count_unordered_strings_at_depth(D)
+
+
+def test_partition_counts_sum_to_all_strings():
+    result = partitions_at_depth(40)
+    assert len(result) == 37338  # partitions of 40
+    assert int(result.counts.sum()) == 2 ** 39
+
+
+def test_composition_counts():
+    W = composition_weights(30)
+    for D in range(1, 31):
+        for M in range(1, D + 1):
+            assert W[D, M] == math.comb(D - 1, M - 1)
+    assert W[20, 5] == math.comb(19, 4)
+
+
+def test_weighted_compositions_match_partitions():
+    D = 14
+    weights = np.random.default_rng(0).random(D + 1)
+    W = composition_weights(D, weights)
+    result = partitions_at_depth(D)
+    expected = np.zeros(D + 1)
+    for i in range(len(result)):
+        parts = result.partition(i)
+        expected[len(parts)] += int(result.counts[i]) * math.prod(weights[L] for L in parts)
+    assert np.allclose(W[D], expected)
@@ -0,0 +1,55 @@
+"""
+Tests for animalcrossing.time.string_store: partition counts read back
+from a store are the ones written.
+
+Run with pytest.
+"""
+import numpy as np
+
+from animalcrossing.time import string_store
+from animalcrossing.time.partition_counts import PartitionCounts, partitions_at_depth
+
+
+def assert_same(a, b):
+    assert a.depth == b.depth
+    for field in ['offsets', 'parts', 'counts']:
+        assert getattr(a, field).dtype == getattr(b, field).dtype
+        assert np.array_equal(getattr(a, field), getattr(b, field))
+
+
+def test_build_round_trip(tmp_path):
+    path = string_store.build(12, tmp_path / "counts.bin")
+    store = string_store.open_store(path)
+    try:
+        assert list(store) == list(range(1, 13))
+        for D in store:
+            assert_same(store[D], partitions_at_depth(D))
+        assert store[12].to_counter() == partitions_at_depth(12).to_counter()
+    finally:
+        store.close()
+
+
+def test_float_counts_round_trip(tmp_path):
+    ## depths past 64 store float64 counts, use a small depth with float counts in their place
+    exact = partitions_at_depth(9)
+    approximate = PartitionCounts(9, exact.offsets, exact.parts, exact.counts.astype(np.float64))
+    path = tmp_path / "counts.bin"
+    string_store.write_store(path, [approximate, partitions_at_depth(3)])
+    store = string_store.StringStore(path)
+    try:
+        assert list(store) == [3, 9]
+        assert_same(store[9], approximate)
+        assert_same(store[3], partitions_at_depth(3))
+    finally:
+        store.close()
+
+
+def test_default_store_in_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANIMALCROSSING_CACHE", str(tmp_path))
+    assert string_store.build(5) == tmp_path / string_store.RESOURCE_NAME
+    store = string_store.open_store()
+    try:
+        assert store.path == tmp_path / string_store.RESOURCE_NAME
+        assert len(store) == 5
+    finally:
+        store.close()
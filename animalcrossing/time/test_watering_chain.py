@@ -0,0 +1,41 @@
+"""
+Tests for animalcrossing.time.watering_chain against the exact
+enumeration in analytic_results.
+
+Run with pytest.
+"""
+import numpy as np
+import pytest
+
+from animalcrossing.time import analytic_results, watering_chain
+from animalcrossing.time.rules import DEFAULT_RULES, WateringRules
+
+RULES = [DEFAULT_RULES,
+         DEFAULT_RULES.with_visitors(2),
+         WateringRules(base_chances=(0.1, 0.2, 0.3, 0.4, 0.5), cap=5)]  # days past the cap
+
+
+@pytest.mark.parametrize("rules", RULES)
+@pytest.mark.parametrize("px", [0.25, 0.9])
+def test_pmf_matches_enumeration(px, rules):
+    exact = analytic_results._p_up_to_D(px, 12, rules)
+    assert np.allclose(watering_chain.pmf(px, 12, rules), exact, rtol=0, atol=1e-12)
+
+
+def test_pmf_of_many_px():
+    pxs = [0.01, 0.25, 0.5, 1.0]
+    many = watering_chain.pmf(pxs, 30)
+    assert many.shape == (4, 30)
+    for row, px in zip(many, pxs):
+        assert np.allclose(row, watering_chain.pmf(px, 30))
+
+
+def test_moments_match_pmf():
+    px = 0.25
+    days = np.arange(1, 2001)
+    p = watering_chain.pmf(px, days.size)
+    assert watering_chain.cdf(px, days.size)[-1] == pytest.approx(1.0)
+    expected = [np.sum(days ** k * p) for k in range(1, 5)]
+    assert np.allclose(watering_chain.raw_moments(px), expected, rtol=1e-9)
+    ## the first of one pair is the pair itself
+    assert np.allclose(watering_chain.min_raw_moments(px, [1])[0, 0], expected, rtol=1e-9)
@@ -1,101 +1,111 @@
-from collections import Counter, namedtuple
+from collections import namedtuple
 import math
-import datetime
-import pickle
-import glob
-import functools
-import re
 import itertools
-import analytic_results
+from . import analytic_results
+import numpy as np
+from . import string_store
+from .rules import DEFAULT_RULES
+from ..cache import BoundedCache
+from .partition_counts import PartitionCounts, composition_weights
 
 StringComputation = namedtuple("StringComputation",['depth', 'counts','time','total','unique'])
 
-'''
-##Check that new momoized results are the same as previous results written to disk.
-slow_files = glob.glob("UniqueStringsAtDepth[0-9]*.pickle")
-fast_files = []
-for sf in slow_files:
-    s = "Depth"
-    i1 = sf.index(s) + len(s)
-    s = ".pickle"
-    i2 = sf.index(s)
-    num = sf[i1:i2]
-    ff = f"{sf[:i1]}LinearProg{num}.pickle"
-    fast_files.append(ff)
-
-for sf, ff in zip(slow_files,fast_files):
-    all_passed = True
-    with open(sf, 'rb') as f:
-        s_result = pickle.load(f)
-    with open(ff, 'rb') as f:
-        f_result = pickle.load(f)
-    if s_result.counts == f_result.counts:
-        pass
-    else:
-        all_passed = False
-        print(f"Discrepancy in {ff}")
-if all_passed:
-    print("All stored files are equal.")
-'''
-
-def load_results(max_day=None):
-    results = {}
-    for fname in glob.glob("./*LinearProg*.pickle"):
-        match = re.search(r"\d+", fname)
-        num = int(match.group())
-        if max_day is not None and num > max_day:
-            continue
-        with open(fname,'rb') as f:
-            result = pickle.load(f)
-        results[result.depth] = result
-    return results
-
-def probs_on_day(pxs, string_counter):
+def load_results(max_day=None, path=None):
+    """Mapping of day -> PartitionCounts from the string count store (see string_store), nothing is read until used.
+
+    path defaults to the store built by string_store.build (FileNotFoundError until it has been built). Legacy
+    pickles can be converted with string_store.convert_pickles.
+    """
+    store = string_store.open_store(path)
+    if max_day is None:
+        return store
+    return {day: store[day] for day in store if day <= max_day}
+
+def probs_on_day(pxs, string_counter, rules=None):
+    if isinstance(string_counter, PartitionCounts):
+        return [float(p) for p in pmf_grid(pxs, day_weights(string_counter, rules)[None, :])[:, 0]]
     running_sums = [0 for _ in pxs]
     for string, count in string_counter.items():
-        prods = _Is(pxs, string)
+        prods = _Is(pxs, string, rules)
         for i, prod in enumerate(prods):
             running_sums[i] += prod * count
     return running_sums
 
-def probs_on_days(pxs, results):
+def probs_on_days(pxs, results, rules=None):
+    """Evaluate every day in results for every px at once, returns [(px, [p(x,D) for each day])...]."""
     days = sorted(results.keys())
-    probs_by_day = []
-    for day in days:
-        comp = results[day]
-        probs_by_day.append(probs_on_day(pxs,comp.counts))
-    probs_by_px = map(list, zip(*probs_by_day)) ##transpose result
-    return [(px, ps) for px,ps in zip(pxs, probs_by_px)]
-
-def prob_x_on_day(px,string_counter):
+    W = weight_grid([results[day] for day in days], rules)
+    probs_by_px = pmf_grid(pxs, W)
+    return [(px, [float(p) for p in ps]) for px,ps in zip(pxs, probs_by_px)]
+
+def length_weights(max_length, rules=None):
+    """Array of _p(L)*_K(L) for sub-string lengths L = 0..max_length (0 is unused)."""
+    return np.array([0.0] + [_p(L, rules)*_K(L, rules) for L in range(1, max_length+1)])
+
+def partition_features(record: PartitionCounts, rules=None):
+    """Per partition: number of sub-strings M and log(prod(_p(L)*_K(L) for each sub-string length L))."""
+    log_weights = np.log(length_weights(record.depth, rules)[1:])
+    M = record.num_parts()
+    log_prod = np.add.reduceat(log_weights[record.parts.astype(np.intp)-1], record.offsets[:-1])
+    return M, log_prod
+
+def day_weights(record: PartitionCounts, rules=None):
+    """w[M] = sum over partitions with M sub-strings of count*prod(_p(L)*_K(L)), for M = 0..depth."""
+    M, log_prod = partition_features(record, rules)
+    return np.bincount(M, weights=record.counts.astype(float)*np.exp(log_prod), minlength=record.depth+1)
+
+def weight_grid(records, rules=None):
+    """Stack day_weights of each record (one row per day) padded to the same number of sub-strings."""
+    width = max(r.depth for r in records) + 1
+    W = np.zeros((len(records), width))
+    for i, r in enumerate(records):
+        W[i, :r.depth+1] = day_weights(r, rules)
+    return W
+
+def composition_weight_grid(max_day, rules=None):
+    """Same as weight_grid for days 1..max_day without any stored partitions (see partition_counts)."""
+    return composition_weights(max_day, length_weights(max_day, rules))[1:]
+
+def pmf_grid(pxs, W):
+    """P[i, d] = sum over M of px_i*(1-px_i)^(M-1)*W[d, M], i.e. the pmf of every px over every row of W."""
+    px = np.asarray(pxs, dtype=float)[:, None]
+    M = np.arange(W.shape[1])
+    factors = px*(1-px)**np.maximum(M-1, 0)
+    return factors @ W.T
+
+def prob_x_on_day(px,string_counter, rules=None):
     running_sum = 0
     for string, count in string_counter.items():
-        prod = _I(px, string)
+        prod = _I(px, string, rules)
         running_sum += prod*count
     return running_sum
 
-def _p(day):
-    return analytic_results.prob_pair_breed(day)
+def _p(day, rules=None):
+    return analytic_results.prob_pair_breed(day, rules)
 
 
-def _I(px, string):
+def _I(px, string, rules=None):
     M = len(string) #number of sub-strings
-    return px*(1-px)**(M-1)*math.prod(_p(L)*_K(L) for L in string) #each sub-string is an integer of its length
+    return px*(1-px)**(M-1)*math.prod(_p(L, rules)*_K(L, rules) for L in string) #each sub-string is an integer of its length
 
-def _Is(pxs, string):
+def _Is(pxs, string, rules=None):
     M = len(string)
-    prod = math.prod(_p(L) * _K(L) for L in string)  # each sub-string is an integer of its length
+    prod = math.prod(_p(L, rules) * _K(L, rules) for L in string)  # each sub-string is an integer of its length
 
     return [px*(1-px)**(M-1)*prod for px in pxs]
 
-_K_cache = {}
-def _K(L):
-    if L > 20:
-        L = 20
-    if L in _K_cache:
-        return _K_cache[L]
-    val = math.prod(1-_p(i) for i in range(1,L)) ## prod from i=1..L-1 of 1-p(i)
-    _K_cache[L] = val
+_K_cache = BoundedCache("time_to_precomputed_strings._K", maxsize=4096, tags=("rules",))
+def _K(L, rules=None):
+    """prod of 1-_p(i) for i=1..L-1, cached per rule set. Past the rules' cap _p stays _p(cap)."""
+    rules = rules or DEFAULT_RULES
+    if L > rules.cap:
+        return _K(rules.cap, rules) * (1-_p(rules.cap, rules))**(L-rules.cap)
+    key = (rules, L)
+    val = _K_cache.get(key)
+    if val is not None:
+        return val
+    val = math.prod(1-_p(i, rules) for i in range(1,L)) ## prod from i=1..L-1 of 1-p(i)
+    _K_cache[key] = val
     return val
 
 def write_evaluation(file, pmfs):
@@ -114,23 +124,35 @@ def write_evaluation(file, pmfs):
     
 if __name__ == "__main__":
     import time
-    import matplotlib.pyplot as plt
+    from . import watering_chain
+    from .rules import WateringRules
 
+    rules = WateringRules(base_chances=(0.05,)*20)
+    W = composition_weight_grid(60, rules)
+    diff = np.abs(pmf_grid([0.5, 0.0625], W) - watering_chain.pmf([0.5, 0.0625], 60, rules)).max()
+    assert diff < 1e-12, diff
+    print(f"Composition weights match watering_chain for flat 5% rules to day 60 (max difference {diff:.3g}).")
 
     print("Loading precomputed results...")
     results = load_results(None)
     print(f"Done loading {len(results)} precomputed string counts.")
-    max_day = max(results.keys())
-    days = sorted(results.keys())
+    max_day = 75
+    days = list(range(1, max_day+1))
     px = 0.5
 
     pxs = [1.0, 0.5, 0.25, 0.125, 0.0625, 0.03125, 0.015625, 0.0078125, 0.00390625]
     #pxs = [0.5, 0.25, 0.125, 0.0625, 0.0625/2.0, 0.015625]
 
     start_time = time.perf_counter()
-    computed_pmfs = probs_on_days(pxs, results)
+    stored_pmfs = probs_on_days(pxs, results)
     end_time = time.perf_counter()
-    print(f"Time elapsed: {end_time-start_time}s.")
+    print(f"Stored partitions to day {max(results.keys())}, time elapsed: {end_time-start_time}s.")
+
+    start_time = time.perf_counter()
+    W = composition_weight_grid(max_day)
+    computed_pmfs = [(px, [float(p) for p in ps]) for px, ps in zip(pxs, pmf_grid(pxs, W))]
+    end_time = time.perf_counter()
+    print(f"Composition weights to day {max_day}, time elapsed: {end_time-start_time}s.")
 
     # start_time = time.perf_counter()
     # computed_pmfs = []
@@ -145,6 +167,8 @@ if __name__ == "__main__":
 
 
 
+    import matplotlib.pyplot as plt
+
     fig, ax1 = plt.subplots()
     ax2 = ax1.twinx()
 
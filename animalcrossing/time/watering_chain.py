@@ -0,0 +1,170 @@
+"""
+Exact probability mass function (PMF) for breeding a flower X
+from a pair of parents on day D, but not before.
+
+The pair's only state is its watering counter: the number of days
+since it last bred (1..20, every count from the cap of 20 on has the
+same breeding chance, see rules.WateringRules; every function takes a
+rules argument, DEFAULT_RULES if None). Each day a pair
+in state w breeds with probability q(w); the child is X with probability
+px (the chain is absorbed), otherwise the counter restarts at 1. A pair
+which does not breed moves to state w+1. Propagating the distribution
+over states one day at a time gives the exact PMF in O(D*20) for D days,
+instead of enumerating all 2^(D-1) sequences of breeding days as
+analytic_results._p_on_D/_p_up_to_D and the binary_sub_strings modules do.
+
+pmf and cdf accept a single px or an array of many px values and
+evaluate them together. The PMF decays geometrically, by the dominant
+eigenvalue of the transition matrix among the states not yet absorbed
+(tail_ratio).
+
+The raw moments E[T^k] of the day T of the first X follow from the same
+chain without any sampling. With Q = transient_matrix(px) and T = 1 + T'
+(T' the days still needed from the next state, 0 once absorbed),
+
+    m_k = (I - Q)^-1 (1 + sum_{j=1}^{k-1} C(k, j) Q m_j)
+
+is a linear solve per moment (raw_moments). The first of n independent
+pairs has E[T^k] = sum_{d>=0} ((d+1)^k - d^k) S(d)^n with S(d) = 1 - cdf(d),
+summed exactly over the first days and in closed form over the
+geometric tail (min_raw_moments). summary_moments turns raw moments into
+mean, variance, skew and excess kurtosis.
+
+Running as a main/script compares against the exact enumeration
+and ProbabilityMassFunctions.csv and times 5000 days for 1000 px values.
+"""
+import numpy as np
+import scipy.special
+
+from . import analytic_results
+from .rules import DEFAULT_RULES
+from .. import metrics
+
+
+def pair_breed_probs(rules=None):
+    """Probability a pair breeds at watering counts 1..rules.cap (index 0 is count 1)."""
+    return (rules or DEFAULT_RULES).pair_probs()
+
+
+@metrics.timed("watering_chain.pmf")
+def pmf(pxs, days, rules=None):
+    """Probability of first producing X on each day 1..days.
+
+    Returns an array of length days for a scalar px, else shape (len(pxs), days).
+    """
+    px = np.asarray(pxs, dtype=float)
+    scalar = px.ndim == 0
+    px = np.atleast_1d(px)[:, None]
+    q = pair_breed_probs(rules)
+    state = np.zeros((px.shape[0], q.size))
+    state[:, 0] = 1.0
+    result = np.empty((px.shape[0], days))
+    for d in range(days):
+        bred = state @ q
+        result[:, d] = bred * px[:, 0]
+        waiting = state * (1.0 - q)
+        state = np.empty_like(state)
+        state[:, 0] = bred * (1.0 - px[:, 0])
+        state[:, 1:] = waiting[:, :-1]
+        state[:, -1] += waiting[:, -1]
+    return result[0] if scalar else result
+
+
+def transient_matrix(px, rules=None):
+    """Q[w, v]: probability a pair at watering count w+1 is at count v+1 the next day without having bred X."""
+    q = pair_breed_probs(rules)
+    n = q.size
+    Q = np.zeros((n, n))
+    Q[:, 0] = q * (1.0 - px)
+    waiting = np.minimum(np.arange(1, n + 1), n - 1)
+    Q[np.arange(n), waiting] += 1.0 - q
+    return Q
+
+
+def tail_ratio(px, rules=None):
+    """Dominant eigenvalue of transient_matrix(px), the ratio pmf(d+1)/pmf(d) approaches for large d."""
+    return float(np.max(np.abs(np.linalg.eigvals(transient_matrix(px, rules)))))
+
+
+def cdf(pxs, days, rules=None):
+    """Probability of having produced X by each day 1..days, same shapes as pmf."""
+    return np.cumsum(pmf(pxs, days, rules), axis=-1)
+
+
+def raw_moments(pxs, k=4, rules=None):
+    """E[T^1..T^k] of the day T a fresh pair first produces X, shape (k,) for a scalar px else (len(pxs), k)."""
+    px = np.asarray(pxs, dtype=float)
+    scalar = px.ndim == 0
+    Q = np.array([transient_matrix(p, rules) for p in np.atleast_1d(px)])
+    A = np.eye(Q.shape[1]) - Q
+    moments = []
+    for order in range(1, k + 1):
+        b = np.ones(Q.shape[:2])
+        for j, m in enumerate(moments, start=1):
+            b += scipy.special.comb(order, j) * np.einsum('pij,pj->pi', Q, m)
+        moments.append(np.linalg.solve(A, b[..., None])[..., 0])
+    result = np.stack([m[:, 0] for m in moments], axis=-1)
+    return result[0] if scalar else result
+
+
+def geometric_power_sums(start, r, k):
+    """sum_{i>=0} (start+i)^j r^i for j = 0..k (last axis), start and r broadcast against each other."""
+    start, r = np.broadcast_arrays(np.asarray(start, dtype=float), np.asarray(r, dtype=float))
+    ## sum_i i^m r^i = r A_m(r) / (1-r)^(m+1) with the Eulerian polynomial A_m, 1/(1-r) for m = 0
+    eulerian = [[1]]
+    sums = [1.0 / (1.0 - r)]
+    for m in range(1, k + 1):
+        prev = eulerian[-1] + [0]
+        eulerian.append([(j + 1) * prev[j] + (m - j) * (prev[j - 1] if j else 0) for j in range(m)])
+        sums.append(r * np.polyval(eulerian[-1][::-1], r) / (1.0 - r) ** (m + 1))
+    return np.stack([sum(scipy.special.comb(j, m) * start ** (j - m) * sums[m] for m in range(j + 1))
+                     for j in range(k + 1)], axis=-1)
+
+
+def min_raw_moments(pxs, num_pairs, k=4, days=400, rules=None):
+    """E[T^1..T^k] of the first day any of n fresh pairs produces X, shape (len(pxs), len(num_pairs), k).
+
+    Days past days use the geometric tail S(d) = S(days) * tail_ratio^(d - days).
+    """
+    px = np.atleast_1d(np.asarray(pxs, dtype=float))
+    n = np.atleast_1d(np.asarray(num_pairs, dtype=float))[None, :, None]
+    survival = np.clip(1.0 - cdf(px, days, rules), 0.0, 1.0)
+    survival = np.hstack([np.ones((px.size, 1)), survival])  # S(0..days)
+    d = np.arange(days)
+    orders = np.arange(1, k + 1)[:, None]
+    weights = (d + 1.0) ** orders - d ** orders  # (k, days)
+    head = np.einsum('kd,pnd->pnk', weights, survival[:, None, :-1] ** n[..., 0, None])
+    ratio = np.array([tail_ratio(p, rules) for p in px])[:, None] ** n[..., 0]
+    tail = geometric_power_sums(days + 1, ratio, k) - geometric_power_sums(days, ratio, k)
+    tail = tail[..., 1:] * survival[:, -1, None, None] ** n
+    return head + tail
+
+
+def summary_moments(raw):
+    """Mean, variance, skew and excess kurtosis (last axis) from raw moments E[T^1..T^4] (last axis)."""
+    raw = np.asarray(raw, dtype=float)
+    m1, m2, m3, m4 = (raw[..., i] for i in range(4))
+    var = m2 - m1 ** 2
+    mu3 = m3 - 3 * m1 * m2 + 2 * m1 ** 3
+    mu4 = m4 - 4 * m1 * m3 + 6 * m1 ** 2 * m2 - 3 * m1 ** 4
+    return np.stack([m1, var, mu3 / var ** 1.5, mu4 / var ** 2 - 3], axis=-1)
+
+
+if __name__ == "__main__":
+    import time
+    import importlib.resources
+    import pandas as pd
+
+    px = 0.25
+    exact = analytic_results._p_up_to_D(px, 12)
+    print(f"Max difference to enumeration (px={px}, 12 days): {np.max(np.abs(pmf(px, 12) - exact)):.3g}")
+
+    with importlib.resources.open_text("animalcrossing.time", "ProbabilityMassFunctions.csv") as f:
+        df = pd.read_csv(f, index_col='Day')
+    pxs = [float(col[5:]) for col in df]
+    diff = np.abs(pmf(pxs, len(df.index)).T - df.values).max()
+    print(f"Max difference to ProbabilityMassFunctions.csv ({len(pxs)} px, {len(df.index)} days): {diff:.3g}")
+
+    start_time = time.perf_counter()
+    result = pmf(np.geomspace(1e-4, 1, 1000), 5000)
+    print(f"1000 px values to 5000 days took {time.perf_counter() - start_time:.2f} seconds")
@@ -0,0 +1,117 @@
+"""
+Benchmarks of the breeding graphs: enumerating every pair of a
+species, marking generations, the ancestry queries of a large family
+tree (answered by the tree's closure index and by walking the graph) and
+births into trees whose index is already populated.
+"""
+import random
+
+from animalcrossing import cache
+from animalcrossing.breeding.lineage import FamilyTree, IdAllocator, Parent
+from animalcrossing.breeding.probability_chain import ProbabilityChain
+from animalcrossing.flowers import flower
+from animalcrossing.flowers.species import Species
+
+from .harness import Benchmark
+
+TREE_SIZES = [10 ** 3, 10 ** 4]
+BIRTHS = 1000
+QUERY_TREE_SIZE = 5000
+
+
+def _enumerate(species):
+    cache.invalidate("heredity")  # time the enumeration with cold breeding probability caches
+    chain = ProbabilityChain(species)
+    chain.exaustive_enumeration()
+    return chain
+
+
+def _enumerated(species):
+    def setup():
+        flower.init()
+        return _enumerate(species)
+    return setup
+
+
+def _tree(size):
+    """A tree of size members, each child coupled from two random earlier members (no breeding simulated)."""
+    def setup():
+        rng = random.Random(0)
+        ids = IdAllocator()
+        tree = FamilyTree(Parent(None, id=ids()), Parent(None, id=ids()), breed=False, ids=ids)
+        members = tree.members()
+        while len(members) < size:
+            p1, p2 = rng.sample(members, 2)
+            members.append(p1.couple(p2))
+        return tree
+    return setup
+
+
+def _cold(query):
+    def function(tree):
+        tree.closure._ancestors.clear()  # time the index from scratch, not memoized sets
+        tree.closure._descendants.clear()
+        query(tree)
+    return function
+
+
+def _all_ancestors(tree):
+    for member in tree.members():
+        tree.ancestors(member)
+
+
+def _all_descendants(tree):
+    for member in tree.members():
+        tree.descendants(member)
+
+
+def _queried_tree(size):
+    """A tree of size members whose ancestors and descendants have all been asked for."""
+    def setup():
+        tree = _tree(size)()
+        _all_ancestors(tree)
+        _all_descendants(tree)
+        return tree, random.Random(1)
+    return setup
+
+
+def _births(state):
+    tree, rng = state
+    members = tree.closure.members
+    for _ in range(BIRTHS):
+        p1, p2 = rng.sample(members, 2)
+        p1.couple(p2)
+
+
+def _walk_all(relatives):
+    def function(tree):
+        for member in tree.members():
+            Parent._closure(member, relatives)
+    return function
+
+
+BENCHMARKS = [
+    Benchmark(f"ProbabilityChain.exaustive_enumeration[{species.name}]", flower.init,
+              lambda state, species=species: _enumerate(species), repeat=3)
+    for species in Species
+] + [
+    Benchmark(f"ProbabilityChain.mark_generations[{species.name}]", _enumerated(species),
+              lambda chain: chain.mark_generations(), repeat=3)
+    for species in [Species.ROSE, Species.TULIP]
+] + [
+    Benchmark(f"Parent.couple[{BIRTHS} births into a queried tree of {size}]", _queried_tree(size), _births)
+    for size in TREE_SIZES
+] + [
+    Benchmark(f"FamilyTree.ancestors[every member of {QUERY_TREE_SIZE}, cold]", _tree(QUERY_TREE_SIZE),
+              _cold(_all_ancestors), repeat=3),
+    Benchmark(f"FamilyTree.ancestors[every member of {QUERY_TREE_SIZE}, warm]", _tree(QUERY_TREE_SIZE),
+              _all_ancestors, repeat=3),
+    Benchmark(f"Parent._closure[ancestors of every member of {QUERY_TREE_SIZE}]", _tree(QUERY_TREE_SIZE),
+              _walk_all(Parent.parents), repeat=3),
+    Benchmark(f"FamilyTree.descendants[every member of {QUERY_TREE_SIZE}, cold]", _tree(QUERY_TREE_SIZE),
+              _cold(_all_descendants), repeat=3),
+    Benchmark(f"FamilyTree.descendants[every member of {QUERY_TREE_SIZE}, warm]", _tree(QUERY_TREE_SIZE),
+              _all_descendants, repeat=3),
+    Benchmark(f"Parent._closure[descendants of every member of {QUERY_TREE_SIZE}]", _tree(QUERY_TREE_SIZE),
+              _walk_all(Parent.children), repeat=3),
+]
@@ -0,0 +1,44 @@
+"""
+Benchmarks of the flower genetics: loading the heredity table,
+breeding probabilities (with cold and warm caches) and random breeding.
+"""
+import random
+
+from animalcrossing import cache
+from animalcrossing.flowers import flower
+from animalcrossing.flowers.flower import Flower
+from animalcrossing.flowers.species import Species
+
+from .harness import Benchmark
+
+
+def _rose_pairs():
+    flower.init()
+    roses = Flower.genotypes(Species.ROSE)
+    rng = random.Random(0)
+    return [tuple(rng.sample(roses, 2)) for _ in range(100)]
+
+
+def _breeding_probabilities(pairs):
+    cache.invalidate("heredity")  # time the computation, not cache hits
+    _warm_breeding_probabilities(pairs)
+
+
+def _warm_breeding_probabilities(pairs):
+    for f1, f2 in pairs:
+        f1.breeding_probabilities(f2)
+
+
+def _breed(pairs):
+    rng = random.Random(0)
+    for f1, f2 in pairs:
+        f1.breed(f2, rng)
+
+
+BENCHMARKS = [
+    Benchmark("flower.init", None, lambda state: flower.init(), repeat=3),
+    Benchmark("Flower.breeding_probabilities[100 rose pairs]", _rose_pairs, _breeding_probabilities, number=10),
+    Benchmark("Flower.breeding_probabilities[100 rose pairs, warm cache]", _rose_pairs, _warm_breeding_probabilities,
+              number=10),
+    Benchmark("Flower.breed[100 rose pairs]", _rose_pairs, _breed, number=10),
+]
@@ -0,0 +1,47 @@
+"""
+Benchmarks of the breeding time calculations: exact enumeration of
+breeding days, PMFs from precomputed partitions and table lookups.
+"""
+import numpy as np
+
+from animalcrossing.time import analytic_results
+from animalcrossing.time import expected_breeding_time
+from animalcrossing.time import partition_counts
+from animalcrossing.time import time_to_precomputed_strings
+
+from .harness import Benchmark
+
+PXS = [2.0 ** -k for k in range(9)]
+
+
+def _p_up_to_D(days):
+    def function(state):
+        analytic_results._cache.clear()  # time the enumeration, not the memoized sub-products
+        analytic_results._p_up_to_D(0.25, days)
+    return function
+
+
+def _partitions():
+    return {day: partition_counts.partitions_at_depth(day) for day in range(1, 41)}
+
+
+def _lookups():
+    expected_breeding_time.init()
+    rng = np.random.default_rng(0)
+    return np.exp(rng.uniform(np.log(0.004), 0, 10000)), rng.integers(1, 17, 10000)
+
+
+def _single_lookups(state):
+    for px, n in zip(state[0][:1000], state[1][:1000]):
+        expected_breeding_time.time_n_pairs(px, n)
+
+
+BENCHMARKS = [
+    Benchmark("analytic_results._p_up_to_D[12 days]", None, _p_up_to_D(12)),
+    Benchmark("analytic_results._p_up_to_D[14 days]", None, _p_up_to_D(14), repeat=3),
+    Benchmark("time_to_precomputed_strings.probs_on_days[9 px, 40 days]", _partitions,
+              lambda partitions: time_to_precomputed_strings.probs_on_days(PXS, partitions)),
+    Benchmark("expected_breeding_time.time_n_pairs[10000 batched]", _lookups,
+              lambda state: expected_breeding_time.time_n_pairs(*state), number=10),
+    Benchmark("expected_breeding_time.time_n_pairs[1000 single]", _lookups, _single_lookups),
+]
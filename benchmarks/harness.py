@@ -0,0 +1,82 @@
+"""
+Timing and memory measurement for the benchmarks and comparison
+with stored baselines.
+
+A Benchmark has a setup, run once and not measured, whose result is
+passed to its function. The function is timed with time.perf_counter
+over number calls per repeat (the best and median repeat are kept,
+per call), then called once more under tracemalloc for its peak
+memory above what setup already allocated.
+
+Baselines are a json dict of benchmark name -> measurement; compare
+flags a benchmark whose best time or peak memory is more than
+tolerance times its baseline.
+"""
+from collections import namedtuple
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+
+Benchmark = namedtuple("Benchmark", ['name', 'setup', 'function', 'number', 'repeat'], defaults=[1, 5])
+
+Measurement = namedtuple("Measurement", ['best', 'median', 'peak_bytes'])
+
+
+def _noop():
+    return None
+
+
+def measure(benchmark) -> Measurement:
+    """Best and median seconds per call and peak bytes allocated by one call of benchmark.function."""
+    setup = benchmark.setup or _noop
+    state = setup()
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(benchmark.repeat):
+            start = time.perf_counter()
+            for _ in range(benchmark.number):
+                benchmark.function(state)
+            times.append((time.perf_counter() - start) / benchmark.number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        benchmark.function(state)
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return Measurement(min(times), statistics.median(times), peak)
+
+
+def load_baselines(path) -> dict:
+    try:
+        with open(path) as f:
+            return {name: Measurement(**m) for name, m in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(path, measurements: dict):
+    with open(path, 'w') as f:
+        json.dump({name: m._asdict() for name, m in sorted(measurements.items())}, f, indent=2)
+        f.write("\n")
+
+
+def compare(measurement, baseline, tolerance=1.5) -> list:
+    """Names of the quantities ('time', 'memory') of measurement worse than tolerance times baseline."""
+    regressions = []
+    if baseline is None:
+        return regressions
+    if measurement.best > tolerance * baseline.best:
+        regressions.append("time")
+    if measurement.peak_bytes > tolerance * max(baseline.peak_bytes, 1024):
+        regressions.append("memory")
+    return regressions
@@ -0,0 +1,59 @@
+"""
+Run the benchmarks and compare them with the stored baselines.
+
+    python -m benchmarks.run                 run everything, compare with baselines.json
+    python -m benchmarks.run -k members      only benchmarks whose name contains "members"
+    python -m benchmarks.run --update        store the results as the new baselines
+
+Everything needed is packaged with animalcrossing, so benchmarks run
+offline. Exits with status 1 if any benchmark is slower or uses more
+memory than --tolerance times its baseline. Baselines are machine
+specific, update them when running on a different machine.
+"""
+import argparse
+import pathlib
+import sys
+
+from . import bench_breeding
+from . import bench_flowers
+from . import bench_time
+from .harness import compare, load_baselines, measure, save_baselines
+
+BASELINES = pathlib.Path(__file__).parent / "baselines.json"
+BENCHMARKS = bench_flowers.BENCHMARKS + bench_breeding.BENCHMARKS + bench_time.BENCHMARKS
+
+
+def run(benchmarks, baselines, tolerance=1.5, verbose=True) -> tuple:
+    """Measure benchmarks, returns ({name: Measurement}, {name: regressions})."""
+    measurements = {}
+    regressions = {}
+    for benchmark in benchmarks:
+        m = measure(benchmark)
+        measurements[benchmark.name] = m
+        baseline = baselines.get(benchmark.name)
+        worse = compare(m, baseline, tolerance)
+        if worse:
+            regressions[benchmark.name] = worse
+        if verbose:
+            vs = f" ({m.best / baseline.best:.2f}x baseline)" if baseline else " (no baseline)"
+            flag = f"  REGRESSION: {', '.join(worse)}" if worse else ""
+            print(f"{benchmark.name:65s} {m.best * 1e3:10.3f} ms {m.peak_bytes / 2 ** 20:9.2f} MiB{vs}{flag}")
+    return measurements, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the package's hot paths.")
+    parser.add_argument("-k", dest="pattern", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--baselines", default=BASELINES)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--update", action='store_true', help="store the measurements as baselines")
+    args = parser.parse_args()
+
+    selected = [b for b in BENCHMARKS if args.pattern in b.name]
+    baselines = load_baselines(args.baselines)
+    measurements, regressions = run(selected, baselines, args.tolerance)
+    if args.update:
+        save_baselines(args.baselines, {**baselines, **measurements})
+        print(f"Updated {len(measurements)} baselines in {args.baselines}")
+    elif regressions:
+        sys.exit(1)